@@ -0,0 +1,81 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+
+
+# comments and trailing commas are allowed in sublime's json files
+_JSON_JUNK = re.compile(
+    r'("(?:[^"\\]|\\.)*")|//[^\n]*|/\*.*?\*/|,(?=(?:\s|//[^\n]*|/\*.*?\*/)*[}\]])',
+    re.S)
+
+
+class Settings(dict):
+    def get(self, key, default=None):
+        return dict.get(self, key, default)
+
+    def set(self, key, value):
+        self[key] = value
+
+    def has(self, key):
+        return key in self
+
+    def erase(self, key):
+        self.pop(key, None)
+
+
+class Adapter:
+    # the platform and settings used by the core, this pure python implementation
+    # allows the core to run outside of Sublime Text
+
+    def __init__(self, packages_path=None, cache_path=None, settings=None):
+        root = os.path.join(tempfile.gettempdir(), 'ProjectManager')
+        self._packages_path = packages_path or os.path.join(root, 'Packages')
+        self._cache_path = cache_path or os.path.join(root, 'Cache')
+        self.settings = Settings({"projects": "$default"})
+        if settings:
+            self.settings.update(settings)
+
+    def packages_path(self):
+        return self._packages_path
+
+    def cache_path(self):
+        return self._cache_path
+
+    def platform(self):
+        if sys.platform == 'darwin':
+            return 'osx'
+        elif sys.platform.startswith('win'):
+            return 'windows'
+        return 'linux'
+
+    def decode_value(self, content):
+        content = _JSON_JUNK.sub(lambda m: m.group(1) or '', content)
+        if not content.strip():
+            return None
+        return json.loads(content)
+
+    def encode_value(self, data, pretty=False):
+        return json.dumps(data, indent=4 if pretty else None, ensure_ascii=False)
+
+    def message_dialog(self, msg):
+        print(msg)
+
+    def set_timeout(self, callback, delay=0):
+        callback()
+
+    def set_timeout_async(self, callback, delay=0):
+        threading.Timer(delay / 1000, callback).start()
+
+
+_adapter = [Adapter()]
+
+
+def get_adapter():
+    return _adapter[0]
+
+
+def set_adapter(adapter):
+    _adapter[0] = adapter
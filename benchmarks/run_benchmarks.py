@@ -0,0 +1,194 @@
+"""
+Benchmarks of the Project Manager core against synthetic projects libraries.
+
+    python benchmarks/run_benchmarks.py --scale 1000 10000 --output results.json
+
+It runs with plain CPython, Sublime Text is not needed.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PACKAGE_DIR))
+PACKAGE = os.path.basename(PACKAGE_DIR)
+
+adapter = importlib.import_module(PACKAGE + '.adapter')
+core = importlib.import_module(PACKAGE + '.core')
+json_file = importlib.import_module(PACKAGE + '.json_file')
+path_probe = importlib.import_module(PACKAGE + '.path_probe')
+fs_cache = importlib.import_module(PACKAGE + '.fs_cache')
+
+
+def generate_library(root, n_projects, n_roots=2, depth=3, library_ratio=0.1,
+                     recent=50, dead_ratio=0.05, seed=0):
+    rng = random.Random(seed)
+    packages = os.path.join(root, 'Packages')
+    folders_dir = os.path.join(root, 'folders')
+    external_dir = os.path.join(root, 'external')
+    projects_path = [os.path.join(root, 'projects%d' % i) for i in range(n_roots - 1)]
+    projects_path.append('$default')
+    # the first one is the primary directory
+    dirs = projects_path[:-1] + [os.path.join(packages, 'User', 'Projects')]
+
+    n_library = int(n_projects * library_ratio)
+    pfiles = []
+    library = []
+    for i in range(n_projects):
+        folder = os.path.join(folders_dir, 'p%d' % i)
+        if rng.random() >= dead_ratio:
+            os.makedirs(folder)
+        content = json.dumps({"folders": [{"path": folder}], "settings": {"tab_size": 4}})
+
+        if i < n_library:
+            pfile = os.path.join(external_dir, 'p%d' % i, 'p%d.sublime-project' % i)
+            library.append(pfile)
+        else:
+            subdirs = ['d%d' % rng.randrange(10) for _ in range(rng.randrange(depth + 1))]
+            pfile = os.path.join(rng.choice(dirs), *(subdirs + ['p%d.sublime-project' % i]))
+        os.makedirs(os.path.dirname(pfile), exist_ok=True)
+        with open(pfile, 'w') as f:
+            f.write(content)
+        pfiles.append(pfile)
+
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+    with open(os.path.join(dirs[0], 'library.json'), 'w') as f:
+        json.dump(library, f, indent=4)
+    with open(os.path.join(dirs[0], 'recent.json'), 'w') as f:
+        json.dump(rng.sample(pfiles, min(recent, len(pfiles))), f, indent=4)
+
+    settings = {"projects": projects_path}
+    return packages, settings, pfiles
+
+
+def measure(name, func, repeat=1, setup=None):
+    # setup() is called before every run, including the memory run, and is not
+    # measured, it returns the arguments of func
+    times = []
+    for _ in range(repeat):
+        func_args = setup() if setup else ()
+        t = time.perf_counter()
+        func(*func_args)
+        times.append(time.perf_counter() - t)
+
+    # memory is measured in a separate run, tracing slows down the timed runs
+    func_args = setup() if setup else ()
+    tracemalloc.start()
+    func(*func_args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "repeat": repeat,
+        "wall_time": min(times),
+        "wall_time_mean": sum(times) / len(times),
+        "peak_memory": peak
+    }
+    print("  %-28s %10.2f ms %10.1f KiB" % (name, result["wall_time"] * 1000, peak / 1024))
+    return result
+
+
+def run_scale(n_projects, args):
+    root = tempfile.mkdtemp(prefix='pm-bench-')
+    try:
+        packages, settings, pfiles = generate_library(
+            root, n_projects, n_roots=args.roots, depth=args.depth, recent=args.recent)
+        settings["scan_workers"] = args.workers
+        cache_dir = os.path.join(root, 'Cache')
+        adapter.set_adapter(adapter.Adapter(packages, cache_dir, settings))
+
+        def cold_state():
+            # nothing is cached, as at the first start
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            json_file.JsonFile._cache.clear()
+            fs_cache.fs_cache.invalidate()
+            return (core.ProjectsInfo(),)
+
+        print("%d projects" % n_projects)
+        results = []
+        results.append(measure(
+            "refresh_projects (cold)", lambda pi: pi.refresh_projects(), args.repeat,
+            setup=cold_state))
+        pi = core.ProjectsInfo()
+        results.append(measure("refresh_projects", pi.refresh_projects, args.repeat))
+
+        results.append(measure(
+            "restore_snapshot", lambda: core.ProjectsInfo().restore_snapshot(), args.repeat))
+
+        snapshot = pi.snapshot()
+        results.append(measure(
+            "_get_all_projects_info",
+            lambda: pi._get_all_projects_info(snapshot.projects_path, snapshot.dir_index),
+            args.repeat))
+
+        display_settings = (
+            True, True, "recency", "*", "{project_name}{active_project_indicator}")
+        open_files = frozenset(pi.canonical_path(f) for f in pfiles[:5])
+        results.append(measure(
+            "display_projects",
+            lambda: pi.render_projects(pi.info(), open_files, *display_settings),
+            args.repeat))
+
+        recent = pi.recent_projects()
+        sample = [core.pretty_path(f) for f in pfiles[:100]]
+
+        def update_recent():
+            for f in sample:
+                recent.add(f)
+            recent.save()
+
+        results.append(measure("update_recent x100", update_recent, args.repeat))
+
+        def which_project_dir():
+            for f in pfiles:
+                pi.which_project_dir(f)
+
+        results.append(measure("which_project_dir (all)", which_project_dir, args.repeat))
+
+        folders = [info.folder for info in pi.info().values()]
+        results.append(measure(
+            "clean_dead_projects (probe)",
+            lambda: path_probe.probe_paths(folders, timeout=5, workers=args.workers)))
+
+        return {"projects": n_projects, "results": results}
+    finally:
+        adapter.set_adapter(adapter.Adapter())
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--roots', type=int, default=2, help='number of projects directories')
+    parser.add_argument('--depth', type=int, default=3, help='maximum subdirectory depth')
+    parser.add_argument('--recent', type=int, default=50, help='number of recent projects')
+    parser.add_argument('--workers', type=int, default=4, help='scan_workers setting')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    report = {
+        "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "scales": [run_scale(n, args) for n in args.scale]
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print("results are written to %s" % args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,663 @@
+import os
+import platform
+import re
+import subprocess
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+from .adapter import get_adapter
+from .json_file import JsonFile
+from .library import ProjectsLibrary
+from .project_cache import ProjectFileCache, SnapshotCache
+from .project_scanner import ProjectsScanner
+from .recent_projects import RecentProjects
+from .path_index import ProjectsDirIndex
+from .search_index import ProjectSearchIndex
+from .perf_stats import perf_stats
+from .fs_cache import fs_cache
+
+
+def settings():
+    return get_adapter().settings
+
+
+def expand_path(path, relative_to=None):
+    root = None
+    if relative_to:
+        if fs_cache.isfile(relative_to):
+            root = os.path.dirname(relative_to)
+        elif fs_cache.isdir(relative_to):
+            root = relative_to
+
+    if path:
+        path = fs_cache.expanduser(path)
+        if path.endswith(os.sep):
+            path = path[:-1]
+        if root and not os.path.isabs(path):
+            path = os.path.normpath(os.path.join(root, path))
+    return path
+
+
+def pretty_path(path):
+    user_home = fs_cache.home() + os.sep
+    if path and path.startswith(user_home):
+        path = os.path.join("~", path[len(user_home):])
+    return path
+
+
+_computer_name = []
+
+
+def computer_name():
+    if _computer_name:
+        node = _computer_name[0]
+    else:
+        if get_adapter().platform() == 'osx':
+            node = subprocess.check_output(['scutil', '--get', 'ComputerName']).decode().strip()
+        else:
+            node = platform.node().split('.')[0]
+        _computer_name.append(node)
+
+    return node
+
+
+# the types of projects, they are interned so they are compared by identity
+SUBLIME_PROJECT = sys.intern('sublime-project')
+LIBRARY = sys.intern('library')
+
+
+def _split_dir(path):
+    # the directory keeps its trailing separator, so concatenation restores the path
+    i = max(path.rfind(os.sep), path.rfind('/')) + 1
+    return sys.intern(path[:i]), path[i:]
+
+
+class ProjectRecord(tuple):
+    # an immutable entry of the index, the directories of the project file and of
+    # the folder are interned so projects in the same directory share them
+    __slots__ = ()
+
+    def __new__(cls, name, ptype, pfile, folder):
+        return tuple.__new__(
+            cls, (name, sys.intern(ptype)) + _split_dir(pfile) + _split_dir(folder))
+
+    @property
+    def name(self):
+        return self[0]
+
+    @property
+    def type(self):
+        return self[1]
+
+    @property
+    def file(self):
+        return self[2] + self[3]
+
+    @property
+    def folder(self):
+        return self[4] + self[5]
+
+    def __getnewargs__(self):
+        return (self.name, self.type, self.file, self.folder)
+
+    def __repr__(self):
+        return 'ProjectRecord(%r, %r, %r, %r)' % self.__getnewargs__()
+
+
+def render_display_item(project_name, info, is_open, active_project_indicator,
+                        display_format):
+    display_name = display_format.format(
+        project_name=project_name,
+        active_project_indicator=active_project_indicator if is_open else '')
+    return [
+        project_name,
+        display_name.strip(),
+        info.folder,
+        pretty_path(info.file)]
+
+
+# the caches are written this many milliseconds after an incremental update
+SAVE_CACHES_DELAY = 2000
+
+
+ProjectsSnapshot = namedtuple('ProjectsSnapshot', [
+    'projects_path', 'default_dir', 'dir_index', 'info', 'project_stats', 'library_stats',
+    'shadowed_names'])
+
+
+class ProjectsInfo:
+    _instance = None
+
+    def __init__(self, adapter=None):
+        # the global adapter is used unless one is given, e.g. by the tests
+        self._adapter = adapter
+        cache_dir = os.path.join(self.adapter.cache_path(), 'ProjectManager')
+        self._cache = ProjectFileCache(os.path.join(cache_dir, 'projects.json'))
+        self._snapshot_cache = SnapshotCache(os.path.join(cache_dir, 'snapshot.json'))
+        self._scanner = ProjectsScanner()
+        self._lock = threading.RLock()
+        self._snapshot = None
+        self._pending_lock = threading.Lock()
+        self._pending_callbacks = None
+        self._save_lock = threading.Lock()
+        # held only to swap the snapshot, never for a scan
+        self._swap_lock = threading.Lock()
+        self._save_scheduled = False
+        self._saved_snapshot = None
+        self._recent = None
+        self._search_index = None
+
+    @property
+    def adapter(self):
+        return self._adapter or get_adapter()
+
+    @classmethod
+    def get_instance(cls):
+        if not cls._instance:
+            cls._instance = cls()
+        return cls._instance
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            # only block when no index has been built yet
+            with self._lock:
+                if self._snapshot is None:
+                    self._refresh_projects()
+                snapshot = self._snapshot
+        return snapshot
+
+    def restore_snapshot(self):
+        # use the index of the last session until the projects are scanned again,
+        # it is only valid for the same projects directories
+        data = self._snapshot_cache.load()
+        if not data:
+            return False
+        projects_path, default_dir = self._projects_path()
+        try:
+            if tuple(data["projects_path"]) != projects_path:
+                return False
+            snapshot = ProjectsSnapshot(
+                projects_path, default_dir, ProjectsDirIndex(projects_path),
+                MappingProxyType(
+                    {v[0]: ProjectRecord(*v) for v in data["info"]}),
+                {f: tuple(s) for f, s in data["project_stats"].items()},
+                {f: tuple(s) for f, s in data["library_stats"].items()},
+                frozenset(data["shadowed_names"]))
+        except (KeyError, TypeError, AttributeError):
+            return False
+        with self._lock:
+            if self._snapshot is not None:
+                return False
+            self._snapshot = snapshot
+            self._saved_snapshot = snapshot
+        self.adapter.set_timeout_async(lambda: self._resolve_project_files(snapshot))
+        return True
+
+    def _resolve_project_files(self, snapshot):
+        # render_projects looks up the resolved project files in the index of the snapshot
+        for pinfo in snapshot.info.values():
+            snapshot.dir_index.canonical_path(pinfo.file)
+
+    def _set_snapshot(self, snapshot):
+        # readers always see either the old or the new snapshot
+        with self._swap_lock:
+            self._snapshot = snapshot
+
+        # a full refresh, it is compared with the saved index
+        saved = self._saved_snapshot
+        if saved is not None and \
+                saved.projects_path == snapshot.projects_path and \
+                saved.project_stats == snapshot.project_stats and \
+                saved.library_stats == snapshot.library_stats and \
+                dict(saved.info) == dict(snapshot.info):
+            self._saved_snapshot = snapshot
+        else:
+            self.save_caches()
+
+    def save_caches(self):
+        with self._save_lock:
+            self._cache.save()
+            snapshot = self._snapshot
+            if snapshot is None or snapshot is self._saved_snapshot:
+                return
+            self._snapshot_cache.save({
+                "projects_path": snapshot.projects_path,
+                "info": [r.__getnewargs__() for r in snapshot.info.values()],
+                "project_stats": snapshot.project_stats,
+                "library_stats": snapshot.library_stats,
+                "shadowed_names": sorted(snapshot.shadowed_names)
+            })
+            self._saved_snapshot = snapshot
+
+    def save_caches_async(self):
+        # the writes of a burst of updates are coalesced
+        with self._pending_lock:
+            if self._save_scheduled:
+                return
+            self._save_scheduled = True
+
+        def save():
+            with self._pending_lock:
+                self._save_scheduled = False
+            self.save_caches()
+
+        self.adapter.set_timeout_async(save, SAVE_CACHES_DELAY)
+
+    def projects_path(self):
+        return list(self.snapshot().projects_path)
+
+    def primary_dir(self):
+        return self.snapshot().projects_path[0]
+
+    def default_dir(self):
+        return self.snapshot().default_dir
+
+    def info(self):
+        return self.snapshot().info
+
+    def recent_projects(self):
+        fpath = os.path.join(self.primary_dir(), 'recent.json')
+        recent = self._recent
+        if recent is None or recent.fpath != fpath:
+            recent = self._recent = RecentProjects(fpath)
+        else:
+            recent.reload_if_changed()
+        recent.capacity = self.adapter.settings.get('recent_projects_limit', 50)
+        return recent
+
+    def save_recent_projects(self):
+        if self._recent:
+            self._recent.save()
+
+    def search_index(self):
+        snapshot = self.snapshot()
+        cached = self._search_index
+        if cached is None or cached[0] is not snapshot:
+            items = []
+            for name, pinfo in snapshot.info.items():
+                pfile = pinfo.file
+                pdir = snapshot.dir_index.which_project_dir(pfile)
+                subdir = os.path.dirname(os.path.relpath(pfile, pdir)) if pdir else ''
+                items.append(
+                    (name, subdir, pretty_path(pinfo.folder), pretty_path(pfile)))
+            cached = self._search_index = (snapshot, ProjectSearchIndex(sorted(items)))
+        return cached[1]
+
+    def render_projects(self, info, open_files, show_recent_projects_first,
+                        show_active_projects_first, recent_projects_order,
+                        active_project_indicator, display_format):
+        # returns [project name, display name, folder, project file] of the projects in
+        # the order of the quick panel
+        if show_recent_projects_first:
+            recent_keys = self.recent_projects().sort_keys(recent_projects_order)
+        else:
+            recent_keys = {}
+
+        plist = []
+        for project_name, pinfo in info.items():
+            is_open = self.canonical_path(pinfo.file) in open_files
+            item = render_display_item(
+                project_name, pinfo, is_open,
+                str(active_project_indicator), str(display_format))
+            recent_key = recent_keys.get(item[3], (-1, -1))
+            plist.append((
+                (0 if is_open and show_active_projects_first else 1,
+                 -recent_key[0], -recent_key[1], project_name),
+                item))
+
+        plist.sort(key=lambda p: p[0])
+        return [p[1] for p in plist]
+
+    def canonical_path(self, path):
+        return self.snapshot().dir_index.canonical_path(path)
+
+    def which_project_dir(self, pfile, dir_index=None):
+        if dir_index is None:
+            dir_index = self.snapshot().dir_index
+        return dir_index.which_project_dir(expand_path(pfile))
+
+    def refresh_projects(self):
+        with self._lock, perf_stats.timer('refresh_projects'):
+            self._refresh_projects()
+
+    def refresh_projects_async(self, on_done=None, delay=0):
+        with self._pending_lock:
+            scheduled = self._pending_callbacks is not None
+            if not scheduled:
+                self._pending_callbacks = []
+            if on_done:
+                self._pending_callbacks.append(on_done)
+        if scheduled:
+            return
+
+        def refresh():
+            with self._pending_lock:
+                callbacks = self._pending_callbacks
+                self._pending_callbacks = None
+            self.refresh_projects()
+            if self._search_index:
+                # keep the search index warm once it has been used
+                self.search_index()
+            for callback in callbacks:
+                self.adapter.set_timeout(callback)
+
+        self.adapter.set_timeout_async(refresh, delay)
+
+    def _projects_path(self):
+        default_dir = os.path.join(self.adapter.packages_path(), 'User', 'Projects')
+
+        projects_path = []
+
+        user_projects_dirs = self.adapter.settings.get('projects')
+        node = computer_name()
+
+        if isinstance(user_projects_dirs, dict):
+            if node in user_projects_dirs:
+                user_projects_dirs = user_projects_dirs[node]
+            else:
+                user_projects_dirs = []
+
+        if isinstance(user_projects_dirs, str):
+            user_projects_dirs = [user_projects_dirs]
+
+        for folder in user_projects_dirs:
+            p = expand_path(folder)
+            p = p.replace("$default", default_dir)
+            p = p.replace("$hostname", node)
+            projects_path.append(p)
+
+        if default_dir not in projects_path:
+            projects_path.append(default_dir)
+
+        projects_path = tuple(expand_path(d) for d in projects_path)
+        return projects_path, default_dir
+
+    def _refresh_projects(self):
+        projects_path, default_dir = self._projects_path()
+        primary_dir = projects_path[0]
+
+        if not os.path.isdir(default_dir):
+            os.makedirs(default_dir)
+
+        if not os.path.isdir(primary_dir):
+            raise Exception("Directory \"{}\" does not exists.".format(primary_dir))
+
+        self._scanner.configure(
+            self.adapter.settings.get('projects_max_depth', None),
+            self.adapter.settings.get('projects_ignore_patterns', []))
+        # the projects directories are resolved once per refresh
+        dir_index = ProjectsDirIndex(projects_path)
+        info, project_stats, shadowed_names = self._get_all_projects_info(
+            projects_path, dir_index)
+        library_stats = self._stat_files(self._library_files(projects_path))
+        self._set_snapshot(ProjectsSnapshot(
+            projects_path, default_dir, dir_index, MappingProxyType(info), project_stats,
+            library_stats, frozenset(shadowed_names)))
+
+    def _get_all_projects_info(self, projects_path, dir_index):
+        workers = self.adapter.settings.get('scan_workers', 4)
+        if workers and workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return self._collect_projects_info(projects_path, dir_index, executor.map)
+        return self._collect_projects_info(projects_path, dir_index, map)
+
+    def _collect_projects_info(self, projects_path, dir_index, pmap):
+        pfiles = []
+        for pdir in projects_path:
+            for f in self._load_library(pdir, pmap):
+                pfiles.append((f, LIBRARY))
+            for f in self._load_sublime_project_files(pdir):
+                pfiles.append((f, SUBLIME_PROJECT))
+
+        def load(item):
+            f, ptype = item
+            try:
+                st = os.stat(f)
+            except OSError:
+                # removed since it was listed
+                return None, None
+            # resolved on the workers, not by render_projects on the UI thread
+            dir_index.canonical_path(f)
+            return self._get_info_from_project_file(f, dir_index, st, ptype), st
+
+        all_projects_info = {}
+        shadowed_names = set()
+        project_stats = {}
+        # the results are merged in order, the last project of a name wins
+        for info, st in pmap(load, pfiles):
+            if info is None:
+                continue
+            if info.name in all_projects_info:
+                shadowed_names.add(info.name)
+            all_projects_info[info.name] = info
+            if info.type is SUBLIME_PROJECT:
+                project_stats[info.file] = (st.st_mtime_ns, st.st_size)
+
+        self._cache.prune(f for f, _ in pfiles)
+        self._cache.save()
+        return all_projects_info, project_stats, shadowed_names
+
+    def library(self, pdir):
+        return ProjectsLibrary(os.path.join(pdir, 'library.json'))
+
+    def _library_files(self, projects_path):
+        # the journals are included, appends of other instances are picked up by polling
+        return [f for pdir in projects_path for f in self.library(pdir).files()]
+
+    def _stat_files(self, files):
+        stats = {}
+        for f in files:
+            try:
+                st = os.stat(f)
+            except OSError:
+                continue
+            stats[f] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def poll_changes(self):
+        with self._lock:
+            snapshot = self.snapshot()
+            projects_path = snapshot.projects_path
+            if self._stat_files(self._library_files(projects_path)) != snapshot.library_stats:
+                self._refresh_projects()
+                return
+
+            pfiles = []
+            for pdir in projects_path:
+                pfiles.extend(self._load_sublime_project_files(pdir))
+            stats = self._stat_files(pfiles)
+            old_stats = snapshot.project_stats
+            added = [f for f in pfiles if f in stats and f not in old_stats]
+            removed = [f for f in old_stats if f not in stats]
+            modified = [f for f in pfiles if f in old_stats and stats.get(f) != old_stats[f]]
+            if added or removed or modified:
+                self._apply_delta(
+                    removed + modified, [(f, SUBLIME_PROJECT) for f in added + modified])
+
+    def _apply_delta(self, removed, added, on_done=None):
+        # patch the index with the removed project files and the added
+        # (project file, type) pairs, the libraries are expected to be saved already.
+        # It runs on the UI thread, so it never waits for a refresh, which holds the
+        # lock for a whole scan. A refresh which is running may miss the change and
+        # overwrite the patched index, another refresh is scheduled then.
+        refreshing = not self._lock.acquire(blocking=False)
+        if not refreshing:
+            self._lock.release()
+
+        snapshot = self.snapshot()
+        patched = self._patch(snapshot, removed, added)
+        swapped = False
+        if patched is not None:
+            with self._swap_lock:
+                if self._snapshot is snapshot:
+                    self._snapshot = patched
+                    swapped = True
+
+        if swapped:
+            self.save_caches_async()
+            if self._search_index:
+                # keep the search index warm once it has been used
+                self.adapter.set_timeout_async(self.search_index)
+            if on_done:
+                self.adapter.set_timeout(on_done)
+            if refreshing:
+                self.refresh_projects_async()
+        else:
+            self.refresh_projects_async(on_done)
+
+    def _patch(self, snapshot, removed, added):
+        # returns the patched snapshot, or None when the projects directories have to be
+        # scanned again
+        info = dict(snapshot.info)
+        project_stats = dict(snapshot.project_stats)
+        for f, _ in added:
+            fs_cache.invalidate(f)
+        for f in removed:
+            fs_cache.invalidate(f)
+            self._cache.remove(f)
+            pname = self._project_name(f, snapshot.dir_index)
+            if pname not in info or info[pname].file != f:
+                pname = next((k for k, v in info.items() if v.file == f), None)
+            if pname in snapshot.shadowed_names:
+                # another project file provides the same name
+                return None
+            if pname:
+                del info[pname]
+            project_stats.pop(f, None)
+
+        for f, ptype in added:
+            try:
+                st = os.stat(f)
+            except OSError:
+                return None
+            i = self._get_info_from_project_file(f, snapshot.dir_index, st, ptype)
+            if i.name in info:
+                # the order of the projects decides which one of the same name is kept
+                return None
+            info[i.name] = i
+            if ptype is SUBLIME_PROJECT:
+                project_stats[f] = (st.st_mtime_ns, st.st_size)
+
+        return snapshot._replace(
+            info=MappingProxyType(info), project_stats=project_stats,
+            library_stats=self._stat_files(self._library_files(snapshot.projects_path)))
+
+    # the mutations return at once, on_done is called on the UI thread when the
+    # index has the change
+
+    def add_project(self, pfile, on_done=None):
+        # a new project file in one of the projects directories, returns its name
+        pfile = os.path.normpath(pfile)
+        name = self._project_name(pfile, self.snapshot().dir_index)
+        self._apply_delta([], [(pfile, SUBLIME_PROJECT)], on_done)
+        return name
+
+    def rename_project(self, project, new_pfile, on_done=None):
+        # the project file has been moved to new_pfile, returns the new name
+        new_pfile = os.path.normpath(new_pfile)
+        snapshot = self.snapshot()
+        pinfo = snapshot.info[project]
+        name = self._project_name(new_pfile, snapshot.dir_index)
+        self._apply_delta([pinfo.file], [(new_pfile, pinfo.type)], on_done)
+        return name
+
+    def remove_projects(self, projects, on_done=None):
+        # the project files have been deleted or removed from the libraries
+        info = self.snapshot().info
+        self._apply_delta([info[p].file for p in projects if p in info], [], on_done)
+
+    def _project_name(self, pfile, dir_index):
+        pdir = self.which_project_dir(pfile, dir_index)
+        basename = os.path.relpath(pfile, pdir) if pdir else os.path.basename(pfile)
+        return re.sub(r'\.sublime-project$', '', basename)
+
+    def _load_library(self, folder, pmap=map):
+        with perf_stats.timer('load_library'):
+            pfiles = []
+            library = self.library(folder)
+            if library.exists():
+                candidates = library.load()
+                exists = list(pmap(fs_cache.exists, candidates))
+                # a cached miss is confirmed before the entry is dropped
+                missing = [f for f, e in zip(candidates, exists)
+                           if not e and not os.path.exists(f)]
+                if missing:
+                    library.remove(missing)
+                missing = set(missing)
+                pfiles = sorted(f for f in candidates if f not in missing)
+            return pfiles
+
+    def _get_info_from_project_file(self, pfile, dir_index, st=None, ptype=SUBLIME_PROJECT):
+        pname = self._project_name(pfile, dir_index)
+
+        if st is None:
+            st = os.stat(pfile)
+        folder = self._cache.get(pfile, st)
+        if folder is None:
+            perf_stats.count('project_files_parsed')
+            pd = JsonFile(pfile).load()
+            if pd and 'folders' in pd and pd['folders']:
+                folder = expand_path(pd['folders'][0].get('path', ''), relative_to=pfile)
+            else:
+                folder = ''
+            self._cache.set(pfile, st, folder)
+        return ProjectRecord(pname, ptype, pfile, folder)
+
+    def _load_sublime_project_files(self, folder):
+        with perf_stats.timer('scan_projects_dir'):
+            pfiles = self._scanner.scan(folder)
+        perf_stats.count('project_files_scanned', len(pfiles))
+        return pfiles
+
+    def find_new_projects(self, roots):
+        # project files under the roots which are not known yet, the roots are scanned
+        # in parallel
+        snapshot = self.snapshot()
+        ignore_patterns = self.adapter.settings.get('projects_ignore_patterns', [])
+        # the roots can be large trees, e.g. the home directory
+        max_depth = self.adapter.settings.get('import_projects_max_depth', 5)
+
+        def scan(root):
+            return ProjectsScanner(max_depth, ignore_patterns).scan(expand_path(root))
+
+        workers = self.adapter.settings.get('scan_workers', 4)
+        with ThreadPoolExecutor(max_workers=max(1, workers or 1)) as executor:
+            results = list(executor.map(scan, roots))
+
+        known = set(self.canonical_path(p.file) for p in snapshot.info.values())
+        pfiles = []
+        for f in (f for r in results for f in r):
+            if snapshot.dir_index.which_project_dir(f):
+                continue
+            path = self.canonical_path(f)
+            if path not in known:
+                known.add(path)
+                pfiles.append(f)
+        return sorted(pfiles)
+
+    def import_projects(self, pdir, pfiles, on_done=None):
+        # add the project files to the library of pdir with a single append and
+        # update the index incrementally, returns the number of imported projects
+        library = self.library(pdir)
+        known = set(library.load())
+        added = []
+        for f in pfiles:
+            f = os.path.normpath(expand_path(f))
+            if f not in known:
+                known.add(f)
+                added.append(f)
+        if not added:
+            return 0
+        library.add(added)
+        self._apply_delta([], [(f, LIBRARY) for f in added], on_done)
+        return len(added)
+
+    def remove_empty_dirs(self):
+        with self._lock:
+            return sum(
+                self._scanner.remove_empty_dirs(pdir)
+                for pdir in self.snapshot().projects_path)
@@ -0,0 +1,98 @@
+import os
+import stat
+import time
+
+from .perf_stats import perf_stats
+
+
+class FsCache:
+    # filesystem metadata shared by the path helpers, entries live for `ttl` seconds,
+    # missing or unreachable paths are remembered for `negative_ttl` seconds so a
+    # disconnected mount is not hit again on every call
+    max_entries = 50000
+
+    def __init__(self, ttl=2, negative_ttl=10):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # (kind, path) -> (expiry time, value)
+        self._entries = {}
+        self._home = None
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, kind, path, func):
+        key = (kind, path)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            self.hits += 1
+            perf_stats.count('fs_cache_hits')
+            return entry[1]
+        self.misses += 1
+        perf_stats.count('fs_cache_misses')
+        value = func(path)
+        if len(self._entries) >= self.max_entries:
+            self._prune(now)
+        self._entries[key] = (now + (self.ttl if value else self.negative_ttl), value)
+        return value
+
+    def _prune(self, now):
+        for key, entry in list(self._entries.items()):
+            if entry[0] <= now:
+                self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+
+    def _stat(self, path):
+        try:
+            return os.stat(path)
+        except (OSError, ValueError):
+            return None
+
+    def stat(self, path):
+        return self._get('stat', path, self._stat)
+
+    def exists(self, path):
+        return self.stat(path) is not None
+
+    def isdir(self, path):
+        st = self.stat(path)
+        return st is not None and stat.S_ISDIR(st.st_mode)
+
+    def isfile(self, path):
+        st = self.stat(path)
+        return st is not None and stat.S_ISREG(st.st_mode)
+
+    def realpath(self, path):
+        return self._get('realpath', path, os.path.realpath)
+
+    def home(self):
+        if self._home is None:
+            self._home = os.path.expanduser('~')
+        return self._home
+
+    def expanduser(self, path):
+        if path == '~' or path.startswith('~' + os.sep) or \
+                (os.altsep and path.startswith('~' + os.altsep)):
+            return self.home() + path[1:]
+        if path.startswith('~'):
+            # ~user
+            return os.path.expanduser(path)
+        return path
+
+    def invalidate(self, path=None):
+        if path is None:
+            self._entries.clear()
+            return
+        self._entries.pop(('stat', path), None)
+        self._entries.pop(('realpath', path), None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+fs_cache = FsCache()
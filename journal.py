@@ -0,0 +1,165 @@
+import json
+import os
+import platform
+import re
+
+from .json_file import write_atomic
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+# the size of the log of a host when the journal is compacted into the store
+COMPACT_SIZE = 32 * 1024
+
+_node = re.sub(r'[^\w.-]', '_', platform.node().split('.')[0]) or 'local'
+
+
+def _folded(state):
+    # the sequence of the last record of each host which is folded into the store
+    folded = state.get('folded')
+    if not isinstance(folded, dict):
+        return {}
+    return {h: s for h, s in folded.items() if isinstance(s, int)}
+
+
+class _FileLock:
+    # an advisory lock, it serializes the writers of the instances sharing a filesystem
+    def __init__(self, fpath):
+        self.fpath = fpath
+        self._f = None
+
+    def __enter__(self):
+        self._f = open(self.fpath, mode='a+b')
+        try:
+            if fcntl:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1)
+        except Exception:
+            self._f.close()
+            raise
+        return self
+
+    def __exit__(self, *args):
+        try:
+            if fcntl:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._f.close()
+
+
+class Journal:
+    # an append-only log of the changes of a JSON store, a record is a line
+    # [time, op, arg, seq], seq counts the records of a host. Every host appends to
+    # its own log in "<store>.journal/", so hosts sharing a synced directory never
+    # write to the same file.
+    def __init__(self, fpath, compact_size=COMPACT_SIZE):
+        self.fpath = fpath
+        self.dir = fpath + '.journal'
+        self.log = os.path.join(self.dir, _node + '.log')
+        # the data which the owner keeps next to the store, in its own format
+        self.state_file = os.path.join(self.dir, 'state.json')
+        self.compact_size = compact_size
+
+    def lock(self):
+        if not os.path.isdir(self.dir):
+            os.makedirs(self.dir)
+        return _FileLock(os.path.join(self.dir, 'lock'))
+
+    def files(self):
+        try:
+            names = os.listdir(self.dir)
+        except OSError:
+            return []
+        return sorted(os.path.join(self.dir, n) for n in names if n.endswith('.log'))
+
+    def state(self):
+        try:
+            with open(self.state_file, mode='r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _save_state(self, state):
+        data = json.dumps(state, separators=(',', ':')).encode('utf-8')
+        write_atomic(self.state_file, lambda f: f.write(data))
+
+    def _read_log(self, f):
+        # the complete records of a log, [time, op, arg, seq]
+        try:
+            with open(f, mode='r', encoding='utf-8') as fp:
+                lines = fp.read().splitlines()
+        except OSError:
+            return []
+        records = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # a partially written record
+                continue
+            if isinstance(record, list) and len(record) == 4 and \
+                    isinstance(record[0], (int, float)) and isinstance(record[3], int):
+                records.append(record)
+        return records
+
+    def _read_logs(self, state):
+        # (time, seq, host, record) of all the hosts, the records which have been folded
+        # into the store are skipped, e.g. those of a log which is synced back after it
+        # is removed. The records are marked by their sequence, so a clock stepping back
+        # does not drop them.
+        folded = _folded(state)
+        logs = []
+        for f in self.files():
+            host = os.path.basename(f)[:-4]
+            mark = folded.get(host, 0)
+            logs.extend((r[0], r[3], host, r[:3]) for r in self._read_log(f) if r[3] > mark)
+        logs.sort()
+        return logs
+
+    def records(self, state=None):
+        # the records of all the hosts in the order of time
+        return [r for _, _, _, r in self._read_logs(self.state() if state is None else state)]
+
+    def append(self, records):
+        # records are (time, op, arg), returns True when the journal should be compacted
+        with self.lock():
+            # the sequence of this host goes on from its last record, folded or not
+            seqs = [r[3] for r in self._read_log(self.log)]
+            seq = max([_folded(self.state()).get(_node, 0)] + seqs)
+            data = ''.join(
+                json.dumps(list(r) + [seq + i], separators=(',', ':')) + '\n'
+                for i, r in enumerate(records, 1))
+            # a single write of complete lines
+            with open(self.log, mode='ab') as f:
+                f.write(data.encode('utf-8'))
+                size = f.tell()
+        return size >= self.compact_size
+
+    def compact(self, fold):
+        # fold(records, state) saves the store with the records applied and returns the
+        # data to keep in the state. The sequence of the last folded record of each host
+        # is kept in the state too, with the data, and only the log of this host is
+        # removed, the other hosts remove their own logs.
+        with self.lock():
+            state = self.state()
+            logs = self._read_logs(state)
+            folded = _folded(state)
+            for _, seq, host, _ in logs:
+                folded[host] = max(folded.get(host, seq), seq)
+            new_state = dict(fold([r for _, _, _, r in logs], state) or {})
+            new_state['folded'] = folded
+            self._save_state(new_state)
+            try:
+                os.remove(self.log)
+            except OSError:
+                pass
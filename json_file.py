@@ -1,39 +1,115 @@
-import sublime
-import os
-
-
-class JsonFile:
-    def __init__(self, fpath, encoding='utf-8'):
-        self.encoding = encoding
-        self.fpath = fpath
-
-    def load(self, default=[]):
-        self.fdir = os.path.dirname(self.fpath)
-        if not os.path.isdir(self.fdir):
-            os.makedirs(self.fdir)
-        if os.path.exists(self.fpath):
-            with open(self.fpath, mode='r', encoding=self.encoding) as f:
-                content = f.read()
-                try:
-                    data = sublime.decode_value(content)
-                except Exception:
-                    sublime.message_dialog('%s is bad!' % self.fpath)
-                    raise
-                if not data:
-                    data = default
-        else:
-            with open(self.fpath, mode='w', encoding=self.encoding, newline='\n') as f:
-                data = default
-                f.write(sublime.encode_value(data, True))
-        return data
-
-    def save(self, data, indent=4):
-        self.fdir = os.path.dirname(self.fpath)
-        if not os.path.isdir(self.fdir):
-            os.makedirs(self.fdir)
-        with open(self.fpath, mode='w', encoding=self.encoding, newline='\n') as f:
-            f.write(sublime.encode_value(data, True))
-
-    def remove(self):
-        if os.path.exists(self.fpath):
-            os.remove(self.fpath)
+import os
+import copy
+import threading
+
+from .adapter import get_adapter
+from .perf_stats import perf_stats
+from .fs_cache import fs_cache
+
+
+def write_atomic(fpath, write):
+    # write(f) writes the content to a temporary file which is moved in place, so
+    # readers never see a partially written file, a symlink is kept and its target is
+    # replaced. The file is left as it is when write() returns False.
+    fpath = os.path.realpath(fpath)
+    tmp = '%s.%d.%d.tmp' % (fpath, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp, mode='wb') as f:
+            written = write(f) is not False
+        if written:
+            os.replace(tmp, fpath)
+            return True
+        os.remove(tmp)
+        return False
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class JsonFile:
+    # fpath -> (mtime, size, content, decoded data or None), only the small stores
+    # which are read again and again opt in, e.g. library.json and recent.json
+    _cache = {}
+
+    def __init__(self, fpath, encoding='utf-8', cache=False):
+        self.encoding = encoding
+        self.fpath = fpath
+        self.cache = cache
+
+    def _stat(self):
+        try:
+            return os.stat(self.fpath)
+        except OSError:
+            return None
+
+    def _cached(self, st):
+        if not self.cache:
+            return None
+        cached = JsonFile._cache.get(self.fpath)
+        if cached and st and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached
+        return None
+
+    def load(self, default=[]):
+        self.fdir = os.path.dirname(self.fpath)
+        if not os.path.isdir(self.fdir):
+            os.makedirs(self.fdir)
+        st = self._stat()
+        if st:
+            cached = self._cached(st)
+            if cached and cached[3] is not None:
+                data = cached[3]
+            else:
+                with open(self.fpath, mode='r', encoding=self.encoding) as f:
+                    content = f.read()
+                # the size on disk, the content is decoded to characters
+                perf_stats.count('json_bytes_read', st.st_size)
+                try:
+                    with perf_stats.timer('json_decode'):
+                        data = get_adapter().decode_value(content)
+                except Exception:
+                    get_adapter().message_dialog('%s is bad!' % self.fpath)
+                    raise
+                if self.cache:
+                    JsonFile._cache[self.fpath] = (st.st_mtime_ns, st.st_size, content, data)
+            if self.cache:
+                # the cached copy must not be touched by the caller
+                data = copy.deepcopy(data)
+            if not data:
+                data = default
+        else:
+            data = default
+            self.save(data)
+        return data
+
+    def save(self, data, indent=4):
+        self.fdir = os.path.dirname(self.fpath)
+        if not os.path.isdir(self.fdir):
+            os.makedirs(self.fdir)
+        content = get_adapter().encode_value(data, True)
+
+        st = self._stat()
+        if st:
+            cached = self._cached(st)
+            if cached:
+                if cached[2] == content:
+                    return
+            elif st.st_size == len(content.encode(self.encoding)):
+                with open(self.fpath, mode='r', encoding=self.encoding, newline='') as f:
+                    if f.read() == content:
+                        return
+
+        data = content.encode(self.encoding)
+        write_atomic(self.fpath, lambda f: f.write(data))
+        fs_cache.invalidate(self.fpath)
+
+        st = self._stat()
+        if st and self.cache:
+            JsonFile._cache[self.fpath] = (st.st_mtime_ns, st.st_size, content, None)
+
+    def remove(self):
+        JsonFile._cache.pop(self.fpath, None)
+        if os.path.exists(self.fpath):
+            os.remove(self.fpath)
+            fs_cache.invalidate(self.fpath)
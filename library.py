@@ -0,0 +1,72 @@
+import os
+import time
+
+from .fs_cache import fs_cache
+from .json_file import JsonFile
+from .journal import Journal
+
+
+def _normpath(pfile):
+    return os.path.normpath(fs_cache.expanduser(pfile))
+
+
+class ProjectsLibrary:
+    # library.json of a projects directory, the project files which live elsewhere.
+    # Changes are appended to the journal and folded into library.json once in a while.
+    def __init__(self, fpath):
+        self.fpath = fpath
+        self._journal = Journal(fpath)
+
+    def exists(self):
+        return os.path.exists(self.fpath) or bool(self._journal.files())
+
+    def files(self):
+        # the files which make up the library, for change detection
+        return [self.fpath, self._journal.state_file] + self._journal.files()
+
+    def _read(self, records):
+        pfiles = []
+        seen = set()
+        if os.path.exists(self.fpath):
+            for f in JsonFile(self.fpath, cache=True).load([]):
+                f = _normpath(f)
+                if f not in seen:
+                    seen.add(f)
+                    pfiles.append(f)
+        for _, op, f in records:
+            if not isinstance(f, str):
+                continue
+            f = _normpath(f)
+            if op == 'add' and f not in seen:
+                seen.add(f)
+                pfiles.append(f)
+            elif op == 'remove' and f in seen:
+                seen.remove(f)
+                pfiles.remove(f)
+        return pfiles
+
+    def load(self):
+        return self._read(self._journal.records())
+
+    def add(self, pfiles):
+        self._append([('add', f) for f in pfiles])
+
+    def remove(self, pfiles):
+        self._append([('remove', f) for f in pfiles])
+
+    def replace(self, pfile, new_pfile):
+        self._append([('remove', pfile), ('add', new_pfile)])
+
+    def _append(self, changes):
+        if not changes:
+            return
+        # the records of a single append share the time, they are kept in order
+        now = time.time()
+        if self._journal.append([(now, op, f) for op, f in changes]):
+            self.compact()
+
+    def compact(self):
+        def fold(records, state):
+            JsonFile(self.fpath, cache=True).save(sorted(self._read(records)))
+
+        self._journal.compact(fold)
@@ -0,0 +1,40 @@
+import os
+
+from .fs_cache import fs_cache
+
+
+def _split(path):
+    return [part for part in path.split(os.sep) if part]
+
+
+class ProjectsDirIndex:
+    def __init__(self, projects_path):
+        self._realpaths = {}
+        # a trie of the path components of the resolved projects directories,
+        # the key None of a node holds (order, projects directory)
+        self._root = {}
+        for i, pdir in enumerate(projects_path):
+            node = self._root
+            for part in _split(self.canonical_path(pdir)):
+                node = node.setdefault(part, {})
+            node.setdefault(None, (i, pdir))
+
+    def canonical_path(self, path):
+        try:
+            return self._realpaths[path]
+        except KeyError:
+            rpath = self._realpaths[path] = fs_cache.realpath(path)
+            return rpath
+
+    def which_project_dir(self, pfile):
+        node = self._root
+        found = node.get(None)
+        for part in _split(self.canonical_path(os.path.dirname(pfile))):
+            node = node.get(part)
+            if node is None:
+                break
+            match = node.get(None)
+            # the directory which comes first in projects_path wins
+            if match and (found is None or match[0] < found[0]):
+                found = match
+        return found[1] if found else None
@@ -0,0 +1,139 @@
+import errno
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+
+EXISTS = True
+MISSING = False
+UNREACHABLE = None
+
+
+def probe_path(path):
+    if not path:
+        return MISSING
+    try:
+        os.stat(path)
+        return EXISTS
+    except OSError as e:
+        if e.errno in (errno.ENOENT, errno.ENOTDIR):
+            return MISSING
+        return UNREACHABLE
+
+
+# the probe threads which have not returned yet, e.g. on a hung mount. They can not
+# be stopped, so no more are started once there are too many of them.
+MAX_STUCK_THREADS = 16
+_stuck = [0]
+_stuck_lock = threading.Lock()
+
+
+def _mount_points():
+    # only known on linux, the parent directory is used elsewhere
+    try:
+        with open('/proc/self/mounts', mode='r', encoding='utf-8') as f:
+            return [line.split()[1].replace('\\040', ' ') for line in f if line.strip()]
+    except (OSError, IndexError):
+        return []
+
+
+def _hung_prefix(path, mount_points):
+    # the prefix of the paths which are likely on the same mount as a hung path
+    drive = os.path.splitdrive(path)[0]
+    if drive[:2] in ('\\\\', '//'):
+        # a network share
+        return os.path.join(drive, '')
+    prefix = None
+    for m in mount_points:
+        m = os.path.join(m, '')
+        if m != os.sep and path.startswith(m) and (prefix is None or len(m) > len(prefix)):
+            prefix = m
+    return prefix or os.path.join(os.path.dirname(path), '')
+
+
+def probe_paths(paths, timeout=2, workers=8):
+    # check the paths with a pool of threads. A path which does not answer within the
+    # timeout (e.g. a hung network mount) is reported as unreachable and its thread is
+    # abandoned, the other paths of the same mount are then reported as unreachable
+    # without being probed.
+    results = {}
+    pending = deque(sorted(set(paths)))
+    running = {}
+    hung = []
+    tasks = queue.Queue()
+    done = queue.Queue()
+    # the paths whose threads are abandoned, and those which have been reported
+    abandoned = set()
+    reported = set()
+
+    def worker():
+        while True:
+            path = tasks.get()
+            if path is None:
+                return
+            status = probe_path(path)
+            with _stuck_lock:
+                if path in abandoned:
+                    # it has been replaced
+                    _stuck[0] -= 1
+                    return
+                reported.add(path)
+            done.put((path, status))
+
+    def start_worker():
+        with _stuck_lock:
+            if _stuck[0] >= MAX_STUCK_THREADS:
+                return False
+        threading.Thread(target=worker, daemon=True).start()
+        return True
+
+    live = 0
+    while live < min(max(workers, 1), len(pending)) and start_worker():
+        live += 1
+
+    mount_points = None
+    while pending or running:
+        while pending and len(running) < live:
+            path = pending.popleft()
+            if any(os.path.join(path, '').startswith(p) for p in hung):
+                results[path] = UNREACHABLE
+                continue
+            running[path] = time.time() + timeout
+            tasks.put(path)
+
+        if not running:
+            # no thread is left to probe the rest
+            for path in pending:
+                results[path] = UNREACHABLE
+            break
+
+        wait = max(min(running.values()) - time.time(), 0)
+        try:
+            path, status = done.get(timeout=wait)
+            del running[path]
+            results[path] = status
+        except queue.Empty:
+            now = time.time()
+            for path, deadline in list(running.items()):
+                if deadline > now:
+                    continue
+                with _stuck_lock:
+                    if path in reported:
+                        # the result is on its way
+                        continue
+                    abandoned.add(path)
+                    _stuck[0] += 1
+                del running[path]
+                results[path] = UNREACHABLE
+                if mount_points is None:
+                    mount_points = _mount_points()
+                hung.append(_hung_prefix(path, mount_points))
+                live -= 1
+                if start_worker():
+                    live += 1
+
+    for _ in range(live):
+        tasks.put(None)
+    return results
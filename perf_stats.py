@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import deque
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('stats', 'phase', 'start')
+
+    def __init__(self, stats, phase):
+        self.stats = stats
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.stats.record(self.phase, time.perf_counter() - self.start)
+
+
+def _percentile(sorted_values, p):
+    i = int(round(p / 100 * (len(sorted_values) - 1)))
+    return sorted_values[i]
+
+
+class PerfStats:
+    # opt-in timings of the hot paths, the most recent `size` samples of each phase are kept
+    def __init__(self, size=200):
+        self.enabled = False
+        self.size = size
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._calls = {}
+        self._counters = {}
+
+    def timer(self, phase):
+        if not self.enabled:
+            return _null_timer
+        return _Timer(self, phase)
+
+    def record(self, phase, seconds):
+        with self._lock:
+            timings = self._timings.get(phase)
+            if timings is None:
+                timings = self._timings[phase] = deque(maxlen=self.size)
+            timings.append(seconds)
+            self._calls[phase] = self._calls.get(phase, 0) + 1
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._timings = {}
+            self._calls = {}
+            self._counters = {}
+
+    def summary(self):
+        with self._lock:
+            timings = {k: sorted(v) for k, v in self._timings.items()}
+            calls = dict(self._calls)
+            counters = dict(self._counters)
+        phases = {}
+        for phase, values in timings.items():
+            phases[phase] = {
+                "calls": calls[phase],
+                "samples": len(values),
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "max": values[-1]
+            }
+        return {"phases": phases, "counters": counters}
+
+    def format_summary(self):
+        summary = self.summary()
+        lines = ["%-28s %8s %10s %10s %10s" % (
+            "phase", "calls", "p50 (ms)", "p95 (ms)", "max (ms)")]
+        for phase, s in sorted(summary["phases"].items()):
+            lines.append("%-28s %8d %10.2f %10.2f %10.2f" % (
+                phase, s["calls"], s["p50"] * 1000, s["p95"] * 1000, s["max"] * 1000))
+        if summary["counters"]:
+            lines.append("")
+            lines.append("%-28s %8s" % ("counter", "total"))
+            for name, value in sorted(summary["counters"].items()):
+                lines.append("%-28s %8d" % (name, value))
+        return "\n".join(lines)
+
+
+perf_stats = PerfStats()
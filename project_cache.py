@@ -0,0 +1,87 @@
+import json
+import os
+
+from .json_file import write_atomic
+
+
+def _dump(fpath, data):
+    fdir = os.path.dirname(fpath)
+    if not os.path.isdir(fdir):
+        os.makedirs(fdir)
+    # json.dump() to a stream uses the pure python encoder
+    content = json.dumps(data).encode('utf-8')
+    write_atomic(fpath, lambda f: f.write(content))
+
+
+def _load(fpath, version):
+    try:
+        with open(fpath, mode='r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if isinstance(data, dict) and data.get("version") == version:
+        return data
+    return None
+
+
+# cache of the folder extracted from each *.sublime-project file,
+# an entry is only valid while the mtime and the size of the file are unchanged
+class ProjectFileCache:
+    version = 1
+
+    def __init__(self, fpath):
+        self.fpath = fpath
+        self._entries = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        self._entries = {}
+        self._dirty = False
+        data = _load(self.fpath, self.version)
+        if data:
+            entries = data.get("entries")
+            if isinstance(entries, dict):
+                self._entries = entries
+
+    def get(self, pfile, st):
+        entry = self._entries.get(pfile)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        return None
+
+    def set(self, pfile, st, folder):
+        self._entries[pfile] = [st.st_mtime_ns, st.st_size, folder]
+        self._dirty = True
+
+    def remove(self, pfile):
+        if self._entries.pop(pfile, None) is not None:
+            self._dirty = True
+
+    def prune(self, pfiles):
+        for pfile in set(self._entries) - set(pfiles):
+            del self._entries[pfile]
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        # it may be saved while the entries are updated by another thread
+        self._dirty = False
+        _dump(self.fpath, {"version": self.version, "entries": dict(self._entries)})
+
+
+# the last index of the projects, it is used at startup until the projects
+# directories have been scanned again
+class SnapshotCache:
+    version = 2
+
+    def __init__(self, fpath):
+        self.fpath = fpath
+
+    def load(self):
+        data = _load(self.fpath, self.version)
+        return data.get("snapshot") if data else None
+
+    def save(self, snapshot):
+        _dump(self.fpath, {"version": self.version, "snapshot": snapshot})
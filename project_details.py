@@ -0,0 +1,135 @@
+import os
+import threading
+from collections import namedtuple
+
+from .adapter import get_adapter
+from .path_probe import probe_paths, EXISTS
+
+
+# the status of a project without folders, the others are those of path_probe
+NO_FOLDER = 'no folder'
+
+ProjectDetails = namedtuple('ProjectDetails', ['folders', 'branch', 'status'])
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _git_dir(folder):
+    git = os.path.join(folder, '.git')
+    if os.path.isfile(git):
+        # worktrees and submodules, ".git" is a file "gitdir: <path>"
+        try:
+            with open(git, mode='r', encoding='utf-8') as f:
+                content = f.read().strip()
+        except OSError:
+            return None
+        if content.startswith('gitdir:'):
+            return os.path.normpath(os.path.join(folder, content[7:].strip()))
+        return None
+    return git
+
+
+def git_branch(folder):
+    git = _git_dir(folder)
+    return _read_branch(git) if git else None
+
+
+def _read_branch(git):
+    try:
+        with open(os.path.join(git, 'HEAD'), mode='r', encoding='utf-8') as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+    if head.startswith('ref: refs/heads/'):
+        return head[16:]
+    # detached
+    return head[:7] or None
+
+
+def _folders_count(pfile):
+    try:
+        with open(pfile, mode='r', encoding='utf-8') as f:
+            pd = get_adapter().decode_value(f.read())
+    except Exception:
+        return 0
+    folders = pd.get('folders') if isinstance(pd, dict) else None
+    return len(folders) if isinstance(folders, list) else 0
+
+
+class ProjectDetailsService:
+    # details of the projects which are too slow to compute while the quick panel is
+    # shown, they are computed on a background thread, the most wanted projects first,
+    # and kept until the project file, the folder or the git HEAD changes
+    batch_size = 20
+
+    def __init__(self, timeout=2, workers=8):
+        self.timeout = timeout
+        self.workers = workers
+        # project file -> (key, details)
+        self._details = {}
+        self._lock = threading.Lock()
+        self._pending = []
+        self._thread = None
+        # bumped whenever new details are available
+        self.version = 0
+
+    def get(self, pfile):
+        entry = self._details.get(pfile)
+        return entry[1] if entry else None
+
+    def request(self, projects):
+        # projects are (project file, folder) in the order of priority, the previous
+        # requests are dropped
+        with self._lock:
+            self._pending = list(projects)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def clear(self):
+        with self._lock:
+            self._pending = []
+            self._details = {}
+            self.version += 1
+
+    def _run(self):
+        while True:
+            with self._lock:
+                batch = self._pending[:self.batch_size]
+                self._pending = self._pending[self.batch_size:]
+                if not batch:
+                    self._thread = None
+                    return
+            self._update(batch)
+
+    def _update(self, batch):
+        # folders on hung mounts must not block the others
+        status = probe_paths(
+            [folder for _, folder in batch if folder],
+            timeout=self.timeout, workers=self.workers)
+        changed = False
+        for pfile, folder in batch:
+            state = status.get(folder) if folder else NO_FOLDER
+            git = _git_dir(folder) if state is EXISTS else None
+            key = (
+                _stat_key(pfile),
+                _stat_key(folder) if state is EXISTS else state,
+                _stat_key(os.path.join(git, 'HEAD')) if git else None)
+            entry = self._details.get(pfile)
+            if entry and entry[0] == key:
+                continue
+            details = ProjectDetails(
+                _folders_count(pfile), _read_branch(git) if git else None, state)
+            self._details[pfile] = (key, details)
+            changed = True
+        if changed:
+            self.version += 1
+
+
+project_details = ProjectDetailsService()
@@ -2,15 +2,24 @@ import sublime
 import sublime_plugin
 import subprocess
 import os
-import platform
 import re
-import copy
+import time
 
 
+from .adapter import Adapter, set_adapter
+from .core import ProjectsInfo, expand_path, pretty_path, computer_name  # noqa: F401
 from .json_file import JsonFile
+from .project_scanner import ProjectsWatcher
+from .path_probe import probe_paths, MISSING, UNREACHABLE
+from .perf_stats import perf_stats
+from .fs_cache import fs_cache
+from .project_details import project_details
+from .workspace_file import patch_workspace_project, compact_workspace
 
 SETTINGS_FILENAME = 'project_manager.sublime-settings'
+STARTUP_REFRESH_DELAY = 3000
 pm_settings = None
+projects_watcher = None
 
 
 def preferences_migrator():
@@ -35,17 +44,85 @@ def preferences_migrator():
     sublime.save_settings(SETTINGS_FILENAME)
 
 
+class SublimeAdapter(Adapter):
+    def __init__(self, settings):
+        self.settings = settings
+
+    def packages_path(self):
+        return sublime.packages_path()
+
+    def cache_path(self):
+        return sublime.cache_path()
+
+    def platform(self):
+        return sublime.platform()
+
+    def decode_value(self, content):
+        return sublime.decode_value(content)
+
+    def encode_value(self, data, pretty=False):
+        return sublime.encode_value(data, pretty)
+
+    def message_dialog(self, msg):
+        sublime.message_dialog(msg)
+
+    def set_timeout(self, callback, delay=0):
+        sublime.set_timeout(callback, delay)
+
+    def set_timeout_async(self, callback, delay=0):
+        sublime.set_timeout_async(callback, delay)
+
+
 def plugin_loaded():
     global pm_settings
     pm_settings = sublime.load_settings(SETTINGS_FILENAME)
+    set_adapter(SublimeAdapter(pm_settings))
+    perf_stats.enabled = pm_settings.get("performance_stats", False)
+    fs_cache.ttl = pm_settings.get("fs_cache_ttl", 2)
     if pm_settings.has("projects_path") and pm_settings.get("projects") == "$default":
         preferences_migrator()
     projects_info = ProjectsInfo.get_instance()
-    pm_settings.add_on_change("refresh_projects", projects_info.refresh_projects)
+    if projects_info.restore_snapshot():
+        # the projects list is available at once, verify it after startup has settled
+        projects_info.refresh_projects_async(delay=STARTUP_REFRESH_DELAY)
+    else:
+        projects_info.refresh_projects_async()
+    restart_projects_watcher()
+    pm_settings.add_on_change("refresh_projects", on_settings_change)
 
 
 def plugin_unloaded():
     pm_settings.clear_on_change("refresh_projects")
+    stop_projects_watcher()
+    if ProjectsInfo._instance:
+        ProjectsInfo._instance.save_recent_projects()
+        ProjectsInfo._instance.save_caches()
+
+
+def on_settings_change():
+    perf_stats.enabled = pm_settings.get("performance_stats", False)
+    fs_cache.ttl = pm_settings.get("fs_cache_ttl", 2)
+    ProjectsInfo.get_instance().refresh_projects_async()
+    restart_projects_watcher()
+
+
+def stop_projects_watcher():
+    global projects_watcher
+    if projects_watcher:
+        projects_watcher.stop()
+        projects_watcher = None
+
+
+def restart_projects_watcher():
+    global projects_watcher
+    interval = pm_settings.get("poll_projects_interval", 0)
+    if projects_watcher and projects_watcher.interval == interval:
+        return
+    stop_projects_watcher()
+    if interval and interval > 0:
+        projects_watcher = ProjectsWatcher(
+            interval, ProjectsInfo.get_instance().poll_changes)
+        projects_watcher.start()
 
 
 def subl(*args):
@@ -57,56 +134,134 @@ def subl(*args):
 
     subprocess.Popen([executable_path] + list(args))
 
-    def on_activated():
-        window = sublime.active_window()
-        view = window.active_view()
 
-        if sublime.platform() == 'windows':
-            # fix focus on windows
-            window.run_command('focus_neighboring_group')
-            window.focus_view(view)
+def defer(callback):
+    # run on the next tick of the main thread, e.g. after the current quick panel is closed
+    sublime.set_timeout(callback, 0)
+
+
+def wait_for(predicate, callback, timeout=5000, interval=25, on_timeout=None):
+    # poll the predicate on the main thread and call back with its result once it holds
+    deadline = time.time() + timeout / 1000
+
+    def check():
+        result = predicate()
+        if result:
+            callback(result)
+        elif time.time() < deadline:
+            sublime.set_timeout(check, interval)
+        elif on_timeout:
+            on_timeout()
 
-        sublime_plugin.on_activated(view.id())
-        sublime.set_timeout_async(lambda: sublime_plugin.on_activated_async(view.id()))
+    check()
 
-    sublime.set_timeout(on_activated, 300)
 
+def on_activated(window):
+    view = window.active_view()
+    if not view:
+        return
 
-def expand_path(path, relative_to=None):
-    root = None
-    if relative_to:
-        if os.path.isfile(relative_to):
-            root = os.path.dirname(relative_to)
-        elif os.path.isdir(relative_to):
-            root = relative_to
+    if sublime.platform() == 'windows':
+        # fix focus on windows
+        window.run_command('focus_neighboring_group')
+        window.focus_view(view)
 
-    if path:
-        path = os.path.expanduser(path)
-        if path.endswith(os.sep):
-            path = path[:-1]
-        if root and not os.path.isabs(path):
-            path = os.path.normpath(os.path.join(root, path))
-    return path
+    sublime_plugin.on_activated(view.id())
+    sublime.set_timeout_async(lambda: sublime_plugin.on_activated_async(view.id()))
 
 
-def pretty_path(path):
-    user_home = os.path.expanduser('~') + os.sep
-    if path and path.startswith(user_home):
-        path = os.path.join("~", path[len(user_home):])
-    return path
+def use_window_api():
+    # `open_project_or_workspace` is available since build 4050
+    return pm_settings.get('open_project_engine', 'auto') == 'auto' and \
+        int(sublime.version()) >= 4050
 
 
-def format_directory(item, folder):
+def find_project_window(pfile):
+    pfile = fs_cache.realpath(pfile)
+    for w in sublime.windows():
+        if w.project_file_name() and fs_cache.realpath(w.project_file_name()) == pfile:
+            return w
+    return None
+
+
+def open_project(window, pfile, new_window=False):
+    start = time.perf_counter()
+
+    def on_open(window):
+        if perf_stats.enabled:
+            perf_stats.record('open_project', time.perf_counter() - start)
+        on_activated(window)
+
+    if use_window_api():
+        window.run_command(
+            'open_project_or_workspace', {'file': pfile, 'new_window': new_window})
+    elif new_window:
+        subl('-n', '--project', pfile)
+    else:
+        subl('--project', pfile)
+
+    wait_for(lambda: find_project_window(pfile), on_open)
+
+
+def append_folders(window, paths):
+    if use_window_api():
+        pf = window.project_file_name()
+        data = window.project_data() or {}
+        folders = data.setdefault('folders', [])
+        existing = set(expand_path(f.get('path'), relative_to=pf) for f in folders)
+        for path in paths:
+            if path not in existing:
+                folders.append({'path': path})
+        window.set_project_data(data)
+        on_activated(window)
+    else:
+        subl('-a', *paths)
+
+        def folders_appended():
+            window = sublime.active_window()
+            return all(p in window.folders() for p in paths) and window
+
+        wait_for(folders_appended, on_activated)
+
+
+def format_directory(item, folder, annotation=''):
     if hasattr(sublime, "QuickPanelItem"):
         return sublime.QuickPanelItem(
             item,
             '<a href="%s">%s</a>' % (
                 sublime.command_url('open_dir', {'dir': folder}),
-                pretty_path(folder)))
+                pretty_path(folder)),
+            annotation)
     else:
         return [item, pretty_path(folder)]
 
 
+def format_age(seconds):
+    if seconds < 60:
+        return 'just now'
+    elif seconds < 60 * 60:
+        return '%dm ago' % (seconds // 60)
+    elif seconds < 24 * 60 * 60:
+        return '%dh ago' % (seconds // (60 * 60))
+    return '%dd ago' % (seconds // (24 * 60 * 60))
+
+
+def format_details(details, last_opened, now):
+    parts = []
+    if details:
+        if details.status is MISSING:
+            parts.append('missing')
+        elif details.status is UNREACHABLE:
+            parts.append('unreachable')
+        if details.branch:
+            parts.append(details.branch)
+        if details.folders > 1:
+            parts.append('%d folders' % details.folders)
+    if last_opened:
+        parts.append(format_age(now - last_opened))
+    return ' \u00b7 '.join(parts)
+
+
 def safe_remove(path):
     if os.path.exists(path):
         try:
@@ -115,164 +270,21 @@ def safe_remove(path):
             pass
 
 
-_computer_name = []
-
-
-def computer_name():
-    if _computer_name:
-        node = _computer_name[0]
-    else:
-        if sublime.platform() == 'osx':
-            node = subprocess.check_output(['scutil', '--get', 'ComputerName']).decode().strip()
-        else:
-            node = platform.node().split('.')[0]
-        _computer_name.append(node)
-
-    return node
-
-
 def dont_close_windows_when_empty(func):
+    # `func` returns the project file which it opens, the setting is restored
+    # once the project window is ready
     def f(*args, **kwargs):
         s = sublime.load_settings('Preferences.sublime-settings')
         close_windows_when_empty = s.get('close_windows_when_empty')
         s.set('close_windows_when_empty', False)
-        func(*args, **kwargs)
+        pfile = func(*args, **kwargs)
         if close_windows_when_empty:
-            sublime.set_timeout(
-                lambda: s.set('close_windows_when_empty', close_windows_when_empty),
-                1000)
-    return f
-
-
-class ProjectsInfo:
-    _instance = None
-
-    def __init__(self):
-        self.refresh_projects()
-
-    @classmethod
-    def get_instance(cls):
-        if not cls._instance:
-            cls._instance = cls()
-        return cls._instance
+            def restore(*args):
+                s.set('close_windows_when_empty', close_windows_when_empty)
 
-    def projects_path(self):
-        return self._projects_path
-
-    def primary_dir(self):
-        return self._primary_dir
-
-    def default_dir(self):
-        return self._default_dir
-
-    def info(self):
-        return self._info
-
-    def which_project_dir(self, pfile):
-        pfile = expand_path(pfile)
-        for pdir in self._projects_path:
-            if (os.path.realpath(os.path.dirname(pfile)) + os.path.sep).startswith(
-                    os.path.realpath(pdir) + os.path.sep):
-                return pdir
-        return None
-
-    def refresh_projects(self):
-        self._default_dir = os.path.join(
-            sublime.packages_path(), 'User', 'Projects')
-
-        self._projects_path = []
-
-        user_projects_dirs = pm_settings.get('projects')
-        node = computer_name()
-
-        if isinstance(user_projects_dirs, dict):
-            if node in user_projects_dirs:
-                user_projects_dirs = user_projects_dirs[node]
-            else:
-                user_projects_dirs = []
-
-        if isinstance(user_projects_dirs, str):
-            user_projects_dirs = [user_projects_dirs]
-
-        for folder in user_projects_dirs:
-            p = expand_path(folder)
-            p = p.replace("$default", self._default_dir)
-            p = p.replace("$hostname", node)
-            self._projects_path.append(p)
-
-        if self._default_dir not in self._projects_path:
-            self._projects_path.append(self._default_dir)
-
-        self._projects_path = [expand_path(d) for d in self._projects_path]
-
-        self._primary_dir = self._projects_path[0]
-
-        if not os.path.isdir(self._default_dir):
-            os.makedirs(self._default_dir)
-
-        if not os.path.isdir(self._primary_dir):
-            raise Exception("Directory \"{}\" does not exists.".format(self._primary_dir))
-
-        self._info = self._get_all_projects_info()
-
-    def _get_all_projects_info(self):
-        all_projects_info = {}
-        for pdir in self._projects_path:
-            for f in self._load_library(pdir):
-                info = self._get_info_from_project_file(f)
-                info["type"] = "library"
-                all_projects_info[info["name"]] = info
-
-            for f in self._load_sublime_project_files(pdir):
-                info = self._get_info_from_project_file(f)
-                info["type"] = "sublime-project"
-                all_projects_info[info["name"]] = info
-
-        return all_projects_info
-
-    def _load_library(self, folder):
-        pfiles = []
-        library = os.path.join(folder, 'library.json')
-        if os.path.exists(library):
-            j = JsonFile(library)
-            for f in j.load([]):
-                pfile = expand_path(f)
-                if os.path.exists(pfile) and pfile not in pfiles:
-                    pfiles.append(os.path.normpath(pfile))
-            pfiles.sort()
-            j.save(pfiles)
-        return pfiles
-
-    def _get_info_from_project_file(self, pfile):
-        pdir = self.which_project_dir(pfile)
-        info = {}
-
-        basename = os.path.relpath(pfile, pdir) if pdir else os.path.basename(pfile)
-        pname = re.sub(r'\.sublime-project$', '', basename)
-
-        pd = JsonFile(pfile).load()
-        if pd and 'folders' in pd and pd['folders']:
-            folder = expand_path(pd['folders'][0].get('path', ''), relative_to=pfile)
-        else:
-            folder = ''
-        info["name"] = pname
-        info["folder"] = folder
-        info["file"] = pfile
-        return info
-
-    def _load_sublime_project_files(self, folder):
-        pfiles = []
-        for path, dirs, files in os.walk(folder, followlinks=True):
-            for f in files:
-                f = os.path.join(path, f)
-                if f.endswith('.sublime-project') and f not in pfiles:
-                    pfiles.append(os.path.normpath(f))
-            # remove empty directories
-            for d in dirs:
-                d = os.path.join(path, d)
-                if os.path.exists(d) and len(os.listdir(d)) == 0:
-                    os.rmdir(d)
-        return pfiles
+            wait_for(lambda: pfile and find_project_window(pfile), restore,
+                     on_timeout=restore)
+    return f
 
 
 class Manager:
@@ -280,63 +292,59 @@ class Manager:
         self.window = window
         self.projects_info = ProjectsInfo.get_instance()
 
+    # (key, snapshot, (project names, quick panel items)) shared by all windows
+    _display_cache = None
+
     def display_projects(self):
-        info = copy.deepcopy(self.projects_info.info())
-        self.mark_open_projects(info)
-        plist = list(map(self.render_display_item, info.items()))
-        plist.sort(key=lambda p: p[0])
-        if pm_settings.get('show_recent_projects_first', True):
-            self.move_recent_projects_to_top(plist)
-
-        if pm_settings.get('show_active_projects_first', True):
-            self.move_openning_projects_to_top(plist)
-
-        return [p[0] for p in plist], [format_directory(p[1], p[2]) for p in plist]
-
-    def mark_open_projects(self, info):
-        project_file_names = [
-            os.path.realpath(w.project_file_name())
-            for w in sublime.windows() if w.project_file_name()]
-
-        for v in info.values():
-            if os.path.realpath(v["file"]) in project_file_names:
-                v["star"] = True
-
-    def render_display_item(self, item):
-        project_name, info = item
-        active_project_indicator = str(pm_settings.get('active_project_indicator', '*'))
-        display_format = str(pm_settings.get(
-            'project_display_format', '{project_name}{active_project_indicator}'))
-        if "star" in info:
-            display_name = display_format.format(
-                project_name=project_name, active_project_indicator=active_project_indicator)
-        else:
-            display_name = display_format.format(
-                project_name=project_name, active_project_indicator='')
-        return [
-            project_name,
-            display_name.strip(),
-            info['folder'],
-            pretty_path(info['file'])]
-
-    def move_recent_projects_to_top(self, plist):
-        j = JsonFile(os.path.join(self.projects_info.primary_dir(), 'recent.json'))
-        recent = j.load([])
-        # TODO: it is not needed
-        recent = [pretty_path(p) for p in recent]
-        return plist.sort(
-            key=lambda p: recent.index(p[3]) if p[3] in recent else -1,
-            reverse=True)
-
-    def move_openning_projects_to_top(self, plist):
-        count = 0
-        for i in range(len(plist)):
-            if plist[i][0] != plist[i][1]:
-                plist.insert(count, plist.pop(i))
-                count = count + 1
+        with perf_stats.timer('display_projects'):
+            snapshot = self.projects_info.snapshot()
+            recent = self.projects_info.recent_projects()
+            open_files = self.open_project_files()
+            settings = tuple(pm_settings.get(k, d) for k, d in (
+                ('show_recent_projects_first', True),
+                ('show_active_projects_first', True),
+                ('recent_projects_order', 'recency'),
+                ('active_project_indicator', '*'),
+                ('project_display_format', '{project_name}{active_project_indicator}')))
+            show_details = pm_settings.get('show_project_details', False)
+            # the ages in the details are shown in minutes at the finest
+            key = (recent.fpath, recent.version, open_files, settings,
+                   show_details and (project_details.version, int(time.time() // 60)))
+
+            cache = Manager._display_cache
+            if cache is None or cache[0] != key or cache[1] is not snapshot:
+                cache = (key, snapshot, self.render_projects(
+                    snapshot.info, open_files, *settings, show_details=show_details))
+                Manager._display_cache = cache
+
+            projects, display = cache[2]
+            if show_details:
+                # the details are computed in the background, the top projects first,
+                # they are shown the next time
+                limit = pm_settings.get('project_details_limit', 100)
+                project_details.request(
+                    (snapshot.info[p].file, snapshot.info[p].folder) for p in projects[:limit])
+            return list(projects), list(display)
+
+    def render_projects(self, info, open_files, *settings, show_details=False):
+        plist = self.projects_info.render_projects(info, open_files, *settings)
+        if not show_details:
+            return [p[0] for p in plist], [format_directory(p[1], p[2]) for p in plist]
+
+        recent = self.projects_info.recent_projects()
+        now = time.time()
+        return [p[0] for p in plist], [
+            format_directory(p[1], p[2], format_details(
+                project_details.get(info[p[0]].file), recent.last_opened(p[3]), now))
+            for p in plist]
+
+    def open_project_files(self):
+        return frozenset(
+            self.projects_info.canonical_path(w.project_file_name())
+            for w in sublime.windows() if w.project_file_name())
 
     def project_file_name(self, project):
-        return self.projects_info.info()[project]['file']
+        return self.projects_info.info()[project].file
 
     def project_workspace(self, project):
         return re.sub(r'\.sublime-project$',
@@ -344,29 +352,20 @@ class Manager:
                       self.project_file_name(project))
 
     def update_recent(self, project):
-        j = JsonFile(os.path.join(self.projects_info.primary_dir(), 'recent.json'))
-        recent = j.load([])
-        # TODO: it is not needed
-        recent = [pretty_path(p) for p in recent]
-        pname = pretty_path(self.project_file_name(project))
-        if pname not in recent:
-            recent.append(pname)
-        else:
-            recent.append(recent.pop(recent.index(pname)))
-        # only keep the most recent 50 records
-        if len(recent) > 50:
-            recent = recent[(50 - len(recent)):len(recent)]
-        j.save(recent)
+        with perf_stats.timer('update_recent'):
+            recent = self.projects_info.recent_projects()
+            recent.add(pretty_path(self.project_file_name(project)))
+            # write behind, it is written once for a burst of updates
+            sublime.set_timeout_async(recent.save, 1000)
 
     def clear_recent_projects(self):
         def clear_callback():
             answer = sublime.ok_cancel_dialog('Clear Recent Projects?')
             if answer is True:
-                j = JsonFile(os.path.join(self.projects_info.primary_dir(), 'recent.json'))
-                j.remove()
+                self.projects_info.recent_projects().clear()
                 self.window.run_command("clear_recent_projects_and_workspaces")
 
-        sublime.set_timeout(clear_callback, 100)
+        defer(clear_callback)
 
     def get_project_data(self, project):
         return JsonFile(self.project_file_name(project)).load()
@@ -381,10 +380,10 @@ class Manager:
         window.run_command('close_workspace')
 
     def close_project_by_name(self, project):
-        pfile = os.path.realpath(self.project_file_name(project))
+        pfile = self.projects_info.canonical_path(self.project_file_name(project))
         for w in sublime.windows():
             if w.project_file_name():
-                if os.path.realpath(w.project_file_name()) == pfile:
+                if self.projects_info.canonical_path(w.project_file_name()) == pfile:
                     self.close_project_by_window(w)
                     if w.id() != sublime.active_window().id():
                         w.run_command('close_window')
@@ -415,17 +414,17 @@ class Manager:
                         if on_cancel:
                             on_cancel()
                     elif index == 0:
-                        sublime.set_timeout(lambda: callback(primary_dir), 100)
+                        defer(lambda: callback(primary_dir))
                     elif index == 1:
-                        sublime.set_timeout(lambda: callback(default_dir), 100)
+                        defer(lambda: callback(default_dir))
                     elif index >= 2:
-                        sublime.set_timeout(lambda: callback(remaining_path[index - 2]), 100)
+                        defer(lambda: callback(remaining_path[index - 2]))
 
                 self.window.show_quick_panel(items, _on_select)
                 return
 
         # fallback
-        sublime.set_timeout(lambda: callback(primary_dir), 100)
+        defer(lambda: callback(primary_dir))
 
     def add_project(self, on_cancel=None):
         def add_callback(project, pdir):
@@ -456,8 +455,9 @@ class Manager:
             self.window.run_command('close_project')
             self.window.run_command('close_all')
 
-            self.projects_info.refresh_projects()
-            self.switch_project(project)
+            # on_done runs on a later tick of the main thread
+            project = self.projects_info.add_project(
+                pfile, on_done=lambda: self.switch_project(project))
 
         def _ask_project_name(pdir):
             project = 'New Project'
@@ -489,16 +489,48 @@ class Manager:
                 return
             answer = sublime.ok_cancel_dialog('Import %s?' % os.path.basename(pfile))
             if answer is True:
-                j = JsonFile(os.path.join(pdir, 'library.json'))
-                data = j.load([])
-                if pfile not in data:
-                    data.append(pfile)
-                    j.save(data)
-
-                self.projects_info.refresh_projects()
+                self.projects_info.import_projects(pdir, [pfile])
 
         self.prompt_directory(_import_sublime_project, on_cancel=on_cancel)
 
+    def import_projects(self, on_cancel=None):
+        def on_roots(text):
+            roots = [r.strip() for r in text.split(os.pathsep) if r.strip()]
+            if not roots:
+                return
+            sublime.status_message('Searching for project files...')
+            sublime.set_timeout_async(lambda: find_projects(roots))
+
+        def find_projects(roots):
+            pfiles = self.projects_info.find_new_projects(roots)
+            defer(lambda: preview(pfiles))
+
+        def preview(pfiles):
+            if not pfiles:
+                sublime.message_dialog('No new project files are found.')
+                return
+            names = [pretty_path(f) for f in pfiles]
+            if len(names) > 20:
+                names = names[:20] + ['...']
+            answer = sublime.ok_cancel_dialog(
+                'Import %d projects?\n\n%s' % (len(pfiles), '\n'.join(names)))
+            if answer is True:
+                self.prompt_directory(
+                    lambda pdir: sublime.set_timeout_async(lambda: import_to(pdir, pfiles)),
+                    on_cancel=on_cancel)
+
+        def import_to(pdir, pfiles):
+            count = self.projects_info.import_projects(pdir, pfiles)
+            sublime.status_message('%d projects are imported.' % count)
+
+        folders = self.window.folders()
+        self.window.show_input_panel(
+            'Import projects from:',
+            os.pathsep.join(pretty_path(f) for f in folders),
+            on_roots,
+            None,
+            on_cancel)
+
     def prompt_project(self, callback, on_cancel=None):
         projects, display = self.display_projects()
 
@@ -508,81 +540,197 @@ class Manager:
             elif on_cancel:
                 on_cancel()
 
-        sublime.set_timeout(lambda: self.window.show_quick_panel(display, _), 100)
+        defer(lambda: self.window.show_quick_panel(display, _))
+
+    def search_project(self, callback, on_cancel=None):
+        index = self.projects_info.search_index()
+        limit = pm_settings.get('search_results_limit', 50)
+        state = {"query": None, "matches": None, "results": []}
+
+        def search(query):
+            if state["query"] is not None and query.startswith(state["query"]):
+                # a longer query can only match a subset
+                candidates = state["matches"]
+            else:
+                candidates = None
+            results, matches = index.search(query, limit, candidates)
+            state.update(query=query, matches=matches, results=results)
+            sublime.status_message('%d matching projects: %s' % (
+                len(matches), ', '.join(results[:5])))
+
+        def on_done(query):
+            if query != state["query"]:
+                search(query)
+            info = self.projects_info.info()
+            results = [name for name in state["results"] if name in info]
+            if not results:
+                sublime.status_message('No matching projects.')
+                if on_cancel:
+                    on_cancel()
+                return
+
+            def _(i):
+                if i >= 0:
+                    callback(results[i])
+                elif on_cancel:
+                    on_cancel()
+
+            items = [format_directory(name, info[name].folder) for name in results]
+            defer(lambda: self.window.show_quick_panel(items, _))
+
+        self.window.show_input_panel('Search projects:', '', on_done, search, on_cancel)
 
     def append_project(self, project):
         self.update_recent(project)
         pd = self.get_project_data(project)
         paths = [expand_path(f.get('path'), self.project_file_name(project))
                  for f in pd.get('folders')]
-        subl('-a', *paths)
+        append_folders(self.window, paths)
 
     @dont_close_windows_when_empty
     def switch_project(self, project):
-        self.update_recent(project)
-        self.check_project(project)
-        self.close_project_by_window(self.window)
-        self.close_project_by_name(project)
-        subl('--project', self.project_file_name(project))
-        self.projects_info.refresh_projects()
+        with perf_stats.timer('switch_project'):
+            self.update_recent(project)
+            self.check_project(project)
+            self.close_project_by_window(self.window)
+            self.close_project_by_name(project)
+            open_project(self.window, self.project_file_name(project))
+            return self.project_file_name(project)
 
     @dont_close_windows_when_empty
     def open_in_new_window(self, project):
         self.update_recent(project)
         self.check_project(project)
         self.close_project_by_name(project)
-        subl('-n', '--project', self.project_file_name(project))
-        self.projects_info.refresh_projects()
+        open_project(self.window, self.project_file_name(project), new_window=True)
+        return self.project_file_name(project)
 
     def _remove_project(self, project):
         answer = sublime.ok_cancel_dialog('Remove "%s" from Project Manager?' % project)
         if answer is True:
-            pfile = self.project_file_name(project)
+            self._delete_projects([project])
+            sublime.status_message('Project "%s" is removed.' % project)
+
+    def _delete_projects(self, projects):
+        # the projects which are gone since they were listed are skipped
+        info = self.projects_info.info()
+        projects = [p for p in projects if p in info]
+        library_files = set()
+        for project in projects:
+            pfile = info[project].file
             if self.projects_info.which_project_dir(pfile):
                 self.close_project_by_name(project)
-                safe_remove(self.project_file_name(project))
+                safe_remove(pfile)
                 safe_remove(self.project_workspace(project))
             else:
-                for pdir in self.projects_info.projects_path():
-                    j = JsonFile(os.path.join(pdir, 'library.json'))
-                    data = j.load([])
-                    if pfile in data:
-                        data.remove(pfile)
-                        j.save(data)
-            sublime.status_message('Project "%s" is removed.' % project)
+                library_files.add(pfile)
+
+        if library_files:
+            # one append per library
+            for pdir in self.projects_info.projects_path():
+                library = self.projects_info.library(pdir)
+                if library.exists():
+                    library.remove([f for f in library.load() if f in library_files])
+
+        self.projects_info.remove_projects(projects)
+        return len(projects)
 
     def remove_project(self, project):
         def _():
             self._remove_project(project)
-            self.projects_info.refresh_projects()
 
-        sublime.set_timeout(_, 100)
+        defer(_)
 
     def clean_dead_projects(self):
-        projects_to_remove = []
-        for pname, pi in self.projects_info.info().items():
-            folder = pi['folder']
-            if not os.path.exists(folder):
-                projects_to_remove.append(pname)
-
-        def remove_projects_iteratively():
-            pname = projects_to_remove[0]
-            self._remove_project(pname)
-            projects_to_remove.remove(pname)
-            if len(projects_to_remove) > 0:
-                sublime.set_timeout(remove_projects_iteratively, 100)
+        def check_projects():
+            folders = {pname: pi.folder for pname, pi in self.projects_info.info().items()}
+            status = probe_paths(
+                folders.values(),
+                timeout=pm_settings.get('dead_projects_timeout', 2),
+                workers=pm_settings.get('scan_workers', 4))
+            dead = sorted(p for p, f in folders.items() if status[f] is MISSING)
+            unreachable = sorted(p for p, f in folders.items() if status[f] is UNREACHABLE)
+            defer(lambda: remove_dead_projects(dead, unreachable))
+
+        def remove_dead_projects(dead, unreachable):
+            if unreachable:
+                print("ProjectManager: unreachable projects:", ", ".join(unreachable))
+                note = '\n\n%d unreachable projects are kept, see the console.' % len(
+                    unreachable)
             else:
-                self.projects_info.refresh_projects()
+                note = ''
 
-        if len(projects_to_remove) > 0:
-            sublime.set_timeout(remove_projects_iteratively, 100)
-        else:
-            sublime.message_dialog('No Dead Projects.')
+            if not dead:
+                sublime.message_dialog('No Dead Projects.' + note)
+                return
+
+            names = dead if len(dead) <= 20 else dead[:20] + ['...']
+            answer = sublime.ok_cancel_dialog(
+                'Remove %d dead projects from Project Manager?\n\n%s%s' % (
+                    len(dead), '\n'.join(names), note))
+            if answer is True:
+                count = self._delete_projects(dead)
+                sublime.status_message('%d dead projects are removed.' % count)
+
+        sublime.status_message('Checking for dead projects...')
+        sublime.set_timeout_async(check_projects)
+
+    def compact_workspaces(self):
+        # the workspaces of open projects are written by Sublime Text when they are closed
+        open_files = self.open_project_files()
+        wsfiles = [
+            re.sub(r'\.sublime-project$', '.sublime-workspace', pinfo.file)
+            for pinfo in self.projects_info.info().values()
+            if self.projects_info.canonical_path(pinfo.file) not in open_files]
+        limits = pm_settings.get('workspace_history_limits', {})
+
+        def compact():
+            count = 0
+            saved = 0
+            for wsfile in wsfiles:
+                if not os.path.exists(wsfile):
+                    continue
+                try:
+                    n = compact_workspace(wsfile, limits)
+                except Exception as e:
+                    print('ProjectManager: cannot compact %s: %s' % (wsfile, e))
+                    continue
+                if n:
+                    count += 1
+                    saved += n
+            sublime.status_message(
+                '%d workspaces are compacted, %.1f KB saved.' % (count, saved / 1024))
+
+        sublime.status_message('Compacting workspaces...')
+        sublime.set_timeout_async(compact)
+
+    def show_performance_stats(self):
+        if not perf_stats.enabled:
+            sublime.message_dialog(
+                'Performance stats are disabled, '
+                'set "performance_stats" to true in the Project Manager settings.')
+            return
+
+        text = perf_stats.format_summary()
+        panel = self.window.create_output_panel('project_manager_stats')
+        panel.run_command('append', {'characters': text + '\n'})
+        self.window.run_command('show_panel', {'panel': 'output.project_manager_stats'})
+
+        stats_file = pm_settings.get('performance_stats_file', '')
+        if stats_file:
+            JsonFile(expand_path(stats_file)).save(perf_stats.summary())
+
+    def remove_empty_directories(self):
+        def _():
+            count = self.projects_info.remove_empty_dirs()
+            sublime.status_message('%d empty directories are removed.' % count)
+
+        sublime.set_timeout_async(_)
 
     def edit_project(self, project):
         def on_open():
             self.window.open_file(self.project_file_name(project))
-        sublime.set_timeout_async(on_open, 100)
+        defer(on_open)
 
     def rename_project(self, project):
         def rename_callback(new_project):
@@ -600,27 +748,20 @@ class Manager:
             os.rename(pfile, new_pfile)
             os.rename(wsfile, new_wsfile)
 
-            j = JsonFile(new_wsfile)
-            data = j.load({})
-            if 'project' in data:
-                data['project'] = '%s.sublime-project' % os.path.basename(new_project)
-            j.save(data)
+            patch_workspace_project(
+                new_wsfile, '%s.sublime-project' % os.path.basename(new_project))
 
             if not self.projects_info.which_project_dir(pfile):
                 for pdir in self.projects_info.projects_path():
-                    library = os.path.join(pdir, 'library.json')
-                    if os.path.exists(library):
-                        j = JsonFile(library)
-                        data = j.load([])
-                        if pfile in data:
-                            data.remove(pfile)
-                            data.append(new_pfile)
-                            j.save(data)
+                    library = self.projects_info.library(pdir)
+                    if library.exists() and pfile in library.load():
+                        library.replace(pfile, new_pfile)
 
-            self.projects_info.refresh_projects()
+            def on_done():
+                if reopen:
+                    self.open_in_new_window(new_project)
 
-            if reopen:
-                self.open_in_new_window(new_project)
+            new_project = self.projects_info.rename_project(project, new_pfile, on_done)
 
         def _ask_project_name():
             v = self.window.show_input_panel('New project name:',
@@ -630,7 +771,7 @@ class Manager:
                                              None)
             v.run_command('select_all')
 
-        sublime.set_timeout(_ask_project_name, 100)
+        defer(_ask_project_name)
 
 
 class ProjectManagerCloseProject(sublime_plugin.WindowCommand):
@@ -690,12 +831,14 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
         items = [
             ['Open Project', 'Open project in the current window'],
             ['Open Project in New Window', 'Open project in a new window'],
+            ['Search Projects', 'Search projects by name, folder and file'],
             ['Append Project', 'Append project to current window'],
             ['Edit Project', 'Edit project settings'],
             ['Rename Project', 'Rename project'],
             ['Remove Project', 'Remove from Project Manager'],
             ['Add New Project', 'Add current folders to Project Manager'],
             ['Import Project', 'Import current .sublime-project file'],
+            ['Import Projects', 'Import .sublime-project files under directories'],
             ['Refresh Projects', 'Refresh Projects'],
             ['Clear Recent Projects', 'Clear Recent Projects'],
             ['Remove Dead Projects', 'Remove Dead Projects']
@@ -704,12 +847,14 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
         actions = [
             "open_project",
             "open_in_new_window",
+            "search_project",
             "append_project",
             "edit_project",
             "rename_project",
             "remove_project",
             "add_project",
             "import_sublime_project",
+            "import_projects",
             "refresh_projects",
             "clear_recent_projects",
             "remove_dead_projects"
@@ -720,16 +865,14 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
                 return
             self.run(action=actions[i], caller="manager")
 
-        sublime.set_timeout(
-            lambda: self.window.show_quick_panel(items, callback),
-            100)
+        defer(lambda: self.window.show_quick_panel(items, callback))
 
     def _prompt_project(self, callback):
         self.manager.prompt_project(callback, on_cancel=self._on_cancel)
 
     def _on_cancel(self):
         if self.caller == "manager":
-            sublime.set_timeout(self.run, 100)
+            defer(self.run)
 
     def open_project(self):
         self._prompt_project(self.manager.switch_project)
@@ -737,6 +880,9 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
     def open_project_in_new_window(self):
         self._prompt_project(self.manager.open_in_new_window)
 
+    def search_project(self):
+        self.manager.search_project(self.manager.switch_project, on_cancel=self._on_cancel)
+
     def append_project(self):
         self._prompt_project(self.manager.append_project)
 
@@ -755,11 +901,23 @@ class ProjectManagerCommand(sublime_plugin.WindowCommand):
     def import_sublime_project(self):
         self.manager.import_sublime_project(on_cancel=self._on_cancel)
 
+    def import_projects(self):
+        self.manager.import_projects(on_cancel=self._on_cancel)
+
     def refresh_projects(self):
-        self.manager.projects_info.refresh_projects()
+        self.manager.projects_info.refresh_projects_async()
 
     def clear_recent_projects(self):
         self.manager.clear_recent_projects()
 
     def remove_dead_projects(self):
         self.manager.clean_dead_projects()
+
+    def compact_workspaces(self):
+        self.manager.compact_workspaces()
+
+    def show_performance_stats(self):
+        self.manager.show_performance_stats()
+
+    def remove_empty_directories(self):
+        self.manager.remove_empty_directories()
@@ -0,0 +1,167 @@
+import os
+import stat
+import threading
+from fnmatch import fnmatch
+
+try:
+    from os import scandir
+except ImportError:
+    # python 3.3
+    scandir = None
+
+
+class _DirEntry:
+    __slots__ = ('name', 'path', '_stat')
+
+    def __init__(self, path, name):
+        self.name = name
+        self.path = os.path.join(path, name)
+        self._stat = None
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def is_dir(self):
+        try:
+            return stat.S_ISDIR(self.stat().st_mode)
+        except OSError:
+            return False
+
+
+def _scandir(path):
+    if scandir:
+        return scandir(path)
+    return [_DirEntry(path, name) for name in os.listdir(path)]
+
+
+class ProjectsScanner:
+    def __init__(self, max_depth=None, ignore_patterns=()):
+        # directory -> (mtime, subdirectories, project files)
+        self._dirs = {}
+        self.max_depth = max_depth
+        self.ignore_patterns = tuple(ignore_patterns)
+
+    def configure(self, max_depth=None, ignore_patterns=()):
+        ignore_patterns = tuple(ignore_patterns)
+        if max_depth != self.max_depth or ignore_patterns != self.ignore_patterns:
+            self.max_depth = max_depth
+            self.ignore_patterns = ignore_patterns
+            self.clear()
+
+    def clear(self):
+        self._dirs = {}
+
+    def _ignored(self, name):
+        return any(fnmatch(name, p) for p in self.ignore_patterns)
+
+    def scan(self, folder):
+        folder = os.path.normpath(folder)
+        pfiles = []
+        seen = set()
+        visited = set()
+        # the directories of the current path, a symlink back to one of them is a loop
+        ancestors = set()
+        try:
+            st = os.stat(folder)
+        except OSError:
+            st = None
+        if st:
+            self._scan(folder, st, 0, pfiles, seen, visited, ancestors)
+
+        # forget the directories which have gone
+        prefix = os.path.join(folder, '')
+        for d in list(self._dirs):
+            if (d == folder or d.startswith(prefix)) and d not in visited:
+                del self._dirs[d]
+
+        return pfiles
+
+    def _scan(self, path, st, depth, pfiles, seen, visited, ancestors):
+        inode = (st.st_dev, st.st_ino)
+        if inode in ancestors:
+            return
+        ancestors.add(inode)
+        try:
+            self._scan_dir(path, st, depth, pfiles, seen, visited, ancestors)
+        finally:
+            ancestors.discard(inode)
+
+    def _scan_dir(self, path, st, depth, pfiles, seen, visited, ancestors):
+        visited.add(path)
+
+        entry = self._dirs.get(path)
+        if entry and entry[0] == st.st_mtime_ns:
+            _, subdirs, files = entry
+            subdirs = [(d, None) for d in subdirs]
+        else:
+            subdirs = []
+            files = []
+            try:
+                entries = sorted(_scandir(path), key=lambda e: e.name)
+            except OSError:
+                return
+            for e in entries:
+                if self._ignored(e.name):
+                    continue
+                try:
+                    is_dir = e.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    try:
+                        subdirs.append((e.path, e.stat()))
+                    except OSError:
+                        continue
+                elif e.name.endswith('.sublime-project'):
+                    files.append(os.path.normpath(e.path))
+            self._dirs[path] = (st.st_mtime_ns, [d for d, _ in subdirs], files)
+
+        for f in files:
+            if f not in seen:
+                seen.add(f)
+                pfiles.append(f)
+
+        if self.max_depth is not None and self.max_depth >= 0 and depth >= self.max_depth:
+            return
+
+        for d, dst in subdirs:
+            if dst is None:
+                try:
+                    dst = os.stat(d)
+                except OSError:
+                    continue
+            self._scan(d, dst, depth + 1, pfiles, seen, visited, ancestors)
+
+    def remove_empty_dirs(self, folder):
+        count = 0
+        for path, dirs, files in os.walk(folder, topdown=False):
+            if path == folder or files:
+                continue
+            try:
+                if not os.listdir(path):
+                    os.rmdir(path)
+                    count = count + 1
+            except OSError:
+                pass
+        self.clear()
+        return count
+
+
+class ProjectsWatcher(threading.Thread):
+    def __init__(self, interval, callback):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.callback = callback
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.callback()
+            except Exception as e:
+                print("ProjectManager: failed to poll projects:", e)
+
+    def stop(self):
+        self._stopped.set()
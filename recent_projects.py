@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .json_file import JsonFile
+from .journal import Journal
+
+
+class RecentProjects:
+    # recent.json is the list of the recent project files, the most recent one is the
+    # last, the open counts and times are kept in the state of the journal, so
+    # recent.json stays readable by the older versions sharing the directory
+    def __init__(self, fpath, capacity=50):
+        self.fpath = fpath
+        self.capacity = capacity
+        # project file -> [open count, last opened time], the most recent one is the last
+        self._entries = OrderedDict()
+        # the opens which are not written to the journal yet
+        self._pending = []
+        self._lock = threading.Lock()
+        self._journal = Journal(fpath)
+        self._signature = None
+        # bumped on every change, for the consumers which cache the ordering
+        self.version = 0
+        self.load()
+
+    def _read(self, records, state):
+        entries = OrderedDict()
+        stats = state.get("projects")
+        if not isinstance(stats, dict):
+            stats = {}
+        if os.path.exists(self.fpath):
+            for pfile in JsonFile(self.fpath, cache=True).load([]):
+                if not isinstance(pfile, str) or not pfile:
+                    continue
+                entry = stats.get(pfile)
+                if not isinstance(entry, list) or len(entry) != 2:
+                    # opened by a version which does not count
+                    entry = [1, 0]
+                entries.pop(pfile, None)
+                entries[pfile] = list(entry)
+        for t, op, pfile in records:
+            if op == 'open' and isinstance(pfile, str):
+                self._open(entries, pfile, t)
+        return entries
+
+    def _stat(self):
+        signature = []
+        for f in [self.fpath, self._journal.state_file] + self._journal.files():
+            try:
+                st = os.stat(f)
+            except OSError:
+                continue
+            signature.append((f, st.st_mtime_ns, st.st_size))
+        return signature
+
+    def load(self):
+        self._signature = self._stat()
+        state = self._journal.state()
+        self._entries = self._read(self._journal.records(state), state)
+        with self._lock:
+            for t, _, pfile in self._pending:
+                self._open(self._entries, pfile, t)
+        self._trim(self._entries)
+        self.version += 1
+
+    def reload_if_changed(self):
+        # pick up the projects opened by other instances
+        if self._stat() != self._signature:
+            self.load()
+
+    def save(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending and self._journal.append(pending):
+            self.compact()
+
+    def compact(self):
+        def fold(records, state):
+            entries = self._read(records, state)
+            self._trim(entries)
+            JsonFile(self.fpath, cache=True).save(list(entries))
+            return {"projects": dict(entries)}
+
+        self._journal.compact(fold)
+
+    def clear(self):
+        with self._lock:
+            self._pending = []
+        self._entries.clear()
+        # the records of all the hosts are folded into an empty store
+        self._journal.compact(lambda records, state: JsonFile(self.fpath, cache=True).remove())
+        self.version += 1
+
+    def add(self, pfile, now=None):
+        now = time.time() if now is None else now
+        self._open(self._entries, pfile, now)
+        with self._lock:
+            self._pending.append((now, 'open', pfile))
+        self._trim(self._entries)
+        self.version += 1
+
+    def _open(self, entries, pfile, now):
+        entry = entries.pop(pfile, None)
+        if entry is None:
+            entry = [0, 0]
+        entry[0] = entry[0] + 1
+        entry[1] = now
+        entries[pfile] = entry
+
+    def _trim(self, entries):
+        while len(entries) > max(self.capacity, 0):
+            entries.popitem(last=False)
+
+    def __contains__(self, pfile):
+        return pfile in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def last_opened(self, pfile):
+        entry = self._entries.get(pfile)
+        return entry[1] if entry else None
+
+    def files(self):
+        return list(self._entries)
+
+    def frecency(self, pfile, now=None):
+        count, t = self._entries[pfile]
+        age = (time.time() if now is None else now) - t
+        day = 24 * 60 * 60
+        if age < 4 * day:
+            weight = 100
+        elif age < 14 * day:
+            weight = 70
+        elif age < 31 * day:
+            weight = 50
+        elif age < 90 * day:
+            weight = 30
+        else:
+            weight = 10
+        return count * weight
+
+    def sort_keys(self, order="recency"):
+        # larger keys come first, projects which are not recent should use (-1, -1)
+        now = time.time()
+        keys = {}
+        for rank, pfile in enumerate(self._entries):
+            if order == "frecency":
+                keys[pfile] = (self.frecency(pfile, now), rank)
+            else:
+                keys[pfile] = (rank, rank)
+        return keys
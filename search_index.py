@@ -0,0 +1,95 @@
+import heapq
+
+
+SEPARATORS = frozenset(' /\\-_.')
+
+
+def _char_mask(text):
+    mask = 0
+    for c in set(text):
+        if 'a' <= c <= 'z':
+            mask |= 1 << (ord(c) - 97)
+        elif '0' <= c <= '9':
+            mask |= 1 << (ord(c) - 22)
+        else:
+            mask |= 1 << 36
+    return mask
+
+
+def fuzzy_score(query, text):
+    # the score of matching `query` as a subsequence of `text`, None if it does not match
+    i = text.find(query)
+    if i >= 0:
+        # a substring match, better at the start of a word
+        bonus = 10 if i == 0 or text[i - 1] in SEPARATORS else 0
+        return 100 + 10 * len(query) + bonus - len(text) / 100
+
+    score = 0
+    pos = 0
+    last = -2
+    for c in query:
+        i = text.find(c, pos)
+        if i < 0:
+            return None
+        score += 1
+        if i == last + 1:
+            score += 5
+        if i == 0 or text[i - 1] in SEPARATORS:
+            score += 8
+        last = i
+        pos = i + 1
+    return score - len(text) / 100
+
+
+class ProjectSearchIndex:
+    def __init__(self, items):
+        # items are tuples of (project name, subdirectory, folder, project file)
+        self._names = []
+        self._keys = []
+        self._texts = []
+        self._masks = []
+        for name, subdir, folder, pfile in items:
+            key = name.lower()
+            text = ' '.join((key, subdir, folder, pfile)).lower()
+            self._names.append(name)
+            self._keys.append(key)
+            self._texts.append(text)
+            self._masks.append(_char_mask(text))
+
+    def __len__(self):
+        return len(self._names)
+
+    def search(self, query, limit=50, candidates=None):
+        # returns the top `limit` project names and the ids of all matches,
+        # the ids can be passed as `candidates` to narrow down a longer query
+        query = query.lower().strip()
+        if candidates is None:
+            candidates = range(len(self._names))
+        if not query:
+            return [self._names[i] for i in list(candidates)[:limit]], list(candidates)
+
+        qmask = _char_mask(query.replace(' ', ''))
+        terms = query.split()
+        matches = []
+        scores = []
+        for i in candidates:
+            if self._masks[i] & qmask != qmask:
+                continue
+            score = 0
+            for term in terms:
+                # matches in the project name weight more than in the paths
+                s = fuzzy_score(term, self._keys[i])
+                if s is not None:
+                    s = 2 * s
+                else:
+                    s = fuzzy_score(term, self._texts[i])
+                    if s is None:
+                        break
+                score += s
+            else:
+                matches.append(i)
+                # ties are broken by the order of the items
+                scores.append((score, -i))
+
+        top = heapq.nlargest(limit, scores)
+        return [self._names[-neg_i] for _, neg_i in top], matches
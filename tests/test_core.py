@@ -0,0 +1,245 @@
+from ProjectManager.adapter import Adapter
+from ProjectManager.core import ProjectsInfo
+from ProjectManager.fs_cache import fs_cache
+
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+
+
+class QueueAdapter(Adapter):
+    # the async callbacks are run by the test, like the async thread of Sublime Text
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending = []
+
+    def set_timeout_async(self, callback, delay=0):
+        self.pending.append(callback)
+
+    def run_async(self):
+        while self.pending:
+            self.pending.pop(0)()
+
+
+class TestProjectsInfo(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        # the adapter is given to ProjectsInfo, the global one is left to the plugin
+        self.adapter = QueueAdapter(
+            os.path.join(self.temp_dir, 'Packages'),
+            os.path.join(self.temp_dir, 'Cache'))
+        self.projects_dir = os.path.join(self.temp_dir, 'Packages', 'User', 'Projects')
+        os.makedirs(os.path.join(self.projects_dir, 'sub'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_project(self, pfile, content):
+        with open(pfile, 'w') as f:
+            f.write(content)
+
+    def test_refresh_projects(self):
+        self.write_project(
+            os.path.join(self.projects_dir, 'sub', 'foo.sublime-project'),
+            '{"folders": [{"path": %s},]  // comment\n}' % json.dumps(self.temp_dir))
+        library = os.path.join(self.temp_dir, 'bar.sublime-project')
+        self.write_project(library, '{"folders": [{"path": "."}]}')
+        self.write_project(
+            os.path.join(self.projects_dir, 'library.json'), json.dumps([library]))
+
+        projects_info = ProjectsInfo(self.adapter)
+        info = projects_info.info()
+        foo = os.path.join('sub', 'foo')
+        self.assertEqual(sorted(info), ['bar', foo])
+        self.assertEqual(info[foo].folder, self.temp_dir)
+        self.assertEqual(info['bar'].type, 'library')
+        self.assertEqual(info['bar'].folder, self.temp_dir)
+        self.assertEqual(projects_info.which_project_dir(library), None)
+        self.assertEqual(
+            projects_info.which_project_dir(info[foo].file), self.projects_dir)
+
+    def test_modified_project_file_is_parsed_again(self):
+        pfile = os.path.join(self.projects_dir, 'foo.sublime-project')
+        self.write_project(pfile, '{"folders": [{"path": "a"}]}')
+        projects_info = ProjectsInfo(self.adapter)
+        self.assertEqual(
+            projects_info.info()['foo'].folder, os.path.join(self.projects_dir, 'a'))
+
+        self.write_project(pfile, '{"folders": [{"path": "abc"}]}')
+        projects_info.refresh_projects()
+        self.assertEqual(
+            projects_info.info()['foo'].folder, os.path.join(self.projects_dir, 'abc'))
+
+    def test_restore_snapshot(self):
+        pfile = os.path.join(self.projects_dir, 'foo.sublime-project')
+        self.write_project(pfile, '{"folders": [{"path": "a"}]}')
+        info = ProjectsInfo(self.adapter).info()
+
+        projects_info = ProjectsInfo(self.adapter)
+        self.assertTrue(projects_info.restore_snapshot())
+        self.assertEqual(dict(projects_info.info()), dict(info))
+        # the restored index is verified by the next refresh
+        os.remove(pfile)
+        projects_info.refresh_projects()
+        self.assertEqual(dict(projects_info.info()), {})
+        projects_info = ProjectsInfo(self.adapter)
+        self.assertTrue(projects_info.restore_snapshot())
+        self.assertEqual(dict(projects_info.info()), {})
+
+    def test_project_files_are_resolved_before_rendering(self):
+        self.write_project(os.path.join(self.projects_dir, 'foo.sublime-project'), '{}')
+        self.write_project(os.path.join(self.projects_dir, 'bar.sublime-project'), '{}')
+        projects_info = ProjectsInfo(self.adapter)
+        projects_info.info()
+        restored = ProjectsInfo(self.adapter)
+        self.assertTrue(restored.restore_snapshot())
+        self.adapter.run_async()
+
+        resolved = []
+        realpath = fs_cache.realpath
+        fs_cache.realpath = lambda path: resolved.append(path) or realpath(path)
+        try:
+            for p in [projects_info, restored]:
+                plist = p.render_projects(
+                    p.info(), frozenset(), False, True, 'recency', '*', '{project_name}')
+                self.assertEqual([i[0] for i in plist], ['bar', 'foo'])
+        finally:
+            fs_cache.realpath = realpath
+        self.assertEqual(resolved, [])
+
+    def test_snapshot_of_other_projects_path_is_not_restored(self):
+        ProjectsInfo(self.adapter).refresh_projects()
+        self.adapter.settings.set('projects', [self.temp_dir])
+        self.assertFalse(ProjectsInfo(self.adapter).restore_snapshot())
+
+    def test_import_projects(self):
+        root = os.path.join(self.temp_dir, 'src')
+        os.makedirs(os.path.join(root, 'a'))
+        os.makedirs(os.path.join(root, 'b'))
+        for name in [os.path.join('a', 'foo'), os.path.join('b', 'bar')]:
+            self.write_project(
+                os.path.join(root, name + '.sublime-project'), '{"folders": [{"path": "."}]}')
+        self.write_project(
+            os.path.join(self.projects_dir, 'managed.sublime-project'), '{}')
+
+        projects_info = ProjectsInfo(self.adapter)
+        pfiles = projects_info.find_new_projects([root, self.projects_dir, root])
+        self.assertEqual(pfiles, [
+            os.path.join(root, 'a', 'foo.sublime-project'),
+            os.path.join(root, 'b', 'bar.sublime-project')])
+
+        self.assertEqual(projects_info.import_projects(self.projects_dir, pfiles), 2)
+        info = projects_info.info()
+        self.assertEqual(sorted(info), ['bar', 'foo', 'managed'])
+        self.assertEqual(info['foo'].folder, os.path.join(root, 'a'))
+        self.assertEqual(projects_info.find_new_projects([root]), [])
+        self.assertEqual(projects_info.import_projects(self.projects_dir, pfiles), 0)
+
+        projects_info.save_caches()
+        projects_info.refresh_projects()
+        self.assertEqual(dict(projects_info.info()), dict(info))
+
+    def test_import_projects_max_depth(self):
+        root = os.path.join(self.temp_dir, 'src')
+        deep = os.path.join(root, 'a', 'b', 'c')
+        os.makedirs(deep)
+        for d in [root, deep]:
+            self.write_project(os.path.join(d, 'foo.sublime-project'), '{}')
+        self.adapter.settings.set('import_projects_max_depth', 2)
+        self.assertEqual(
+            ProjectsInfo(self.adapter).find_new_projects([root]),
+            [os.path.join(root, 'foo.sublime-project')])
+        self.adapter.settings.set('import_projects_max_depth', None)
+        self.assertEqual(len(ProjectsInfo(self.adapter).find_new_projects([root])), 2)
+
+    def test_mutations_patch_the_index(self):
+        projects_info = ProjectsInfo(self.adapter)
+        self.assertEqual(dict(projects_info.info()), {})
+
+        pfile = os.path.join(self.projects_dir, 'sub', 'foo.sublime-project')
+        self.write_project(pfile, '{"folders": [{"path": "."}]}')
+        foo = os.path.join('sub', 'foo')
+        self.assertEqual(projects_info.add_project(pfile), foo)
+        self.assertEqual(projects_info.info()[foo].folder, os.path.dirname(pfile))
+
+        new_pfile = os.path.join(self.projects_dir, 'bar.sublime-project')
+        os.rename(pfile, new_pfile)
+        self.assertEqual(projects_info.rename_project(foo, new_pfile), 'bar')
+        self.assertEqual(sorted(projects_info.info()), ['bar'])
+
+        snapshot = projects_info.snapshot()
+        projects_info.poll_changes()
+        self.assertIs(projects_info.snapshot(), snapshot)
+
+        # the caches are written behind
+        projects_info.save_caches()
+        restored = ProjectsInfo(self.adapter)
+        self.assertTrue(restored.restore_snapshot())
+        self.assertEqual(dict(restored.info()), dict(projects_info.info()))
+
+        os.remove(new_pfile)
+        projects_info.remove_projects(['bar'])
+        self.assertEqual(dict(projects_info.info()), {})
+        projects_info.save_caches()
+
+    def test_search_index_is_rebuilt_after_a_mutation(self):
+        projects_info = ProjectsInfo(self.adapter)
+        self.assertEqual(projects_info.search_index().search('foo')[0], [])
+        pfile = os.path.join(self.projects_dir, 'foo.sublime-project')
+        self.write_project(pfile, '{}')
+        projects_info.add_project(pfile)
+        # on the async thread, before the quick panel asks for it
+        self.adapter.run_async()
+        self.assertIs(projects_info._search_index[0], projects_info.snapshot())
+        self.assertEqual(projects_info.search_index().search('foo')[0], ['foo'])
+
+    def test_mutations_do_not_wait_for_a_refresh(self):
+        projects_info = ProjectsInfo(self.adapter)
+        projects_info.info()
+        pfile = os.path.join(self.projects_dir, 'foo.sublime-project')
+        self.write_project(pfile, '{}')
+        locked = threading.Event()
+        release = threading.Event()
+
+        def refresh():
+            # a refresh holds the lock for a whole scan
+            with projects_info._lock:
+                locked.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=refresh)
+        thread.start()
+        locked.wait(5)
+        try:
+            done = threading.Event()
+            self.assertEqual(projects_info.add_project(pfile, on_done=done.set), 'foo')
+            self.assertTrue(done.is_set())
+            self.assertIn('foo', projects_info.info())
+        finally:
+            release.set()
+            thread.join()
+        # the refresh which was running may have missed it
+        self.assertEqual(len(self.adapter.pending), 2)
+        self.adapter.run_async()
+        self.assertIn('foo', projects_info.info())
+
+    def test_name_collision_falls_back_to_a_refresh(self):
+        self.write_project(os.path.join(self.projects_dir, 'foo.sublime-project'), '{}')
+        library = os.path.join(self.temp_dir, 'foo.sublime-project')
+        self.write_project(library, '{}')
+        projects_info = ProjectsInfo(self.adapter)
+        self.assertEqual(sorted(projects_info.info()), ['foo'])
+
+        done = threading.Event()
+        projects_info.import_projects(self.projects_dir, [library], on_done=done.set)
+        self.assertFalse(done.is_set())
+        self.adapter.run_async()
+        self.assertTrue(done.is_set())
+        # the library comes first
+        self.assertEqual(projects_info.info()['foo'].type, 'sublime-project')
+        self.assertIn('foo', projects_info.snapshot().shadowed_names)
@@ -0,0 +1,45 @@
+from ProjectManager.fs_cache import FsCache
+
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+
+class TestFsCache(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_negative_entries(self):
+        cache = FsCache()
+        path = os.path.join(self.temp_dir, 'foo')
+        self.assertFalse(cache.exists(path))
+        os.mkdir(path)
+        self.assertFalse(cache.exists(path))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        cache.invalidate(path)
+        self.assertTrue(cache.isdir(path))
+        self.assertFalse(cache.isfile(path))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_ttl(self):
+        cache = FsCache(ttl=0, negative_ttl=0)
+        path = os.path.join(self.temp_dir, 'foo')
+        self.assertFalse(cache.exists(path))
+        os.mkdir(path)
+        self.assertTrue(cache.exists(path))
+        self.assertEqual(cache.hits, 0)
+
+    def test_expanduser(self):
+        cache = FsCache()
+        self.assertEqual(cache.expanduser('~'), os.path.expanduser('~'))
+        self.assertEqual(
+            cache.expanduser(os.path.join('~', 'foo')),
+            os.path.expanduser(os.path.join('~', 'foo')))
+        self.assertEqual(cache.expanduser('foo~'), 'foo~')
@@ -0,0 +1,135 @@
+from ProjectManager.journal import Journal
+from ProjectManager.library import ProjectsLibrary
+from ProjectManager.recent_projects import RecentProjects
+
+
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+
+class TestJournal(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_records_of_all_hosts_are_merged_in_order(self):
+        journal = Journal(os.path.join(self.temp_dir, 'library.json'))
+        journal.append([(2, 'add', 'b'), (4, 'add', 'd')])
+        with open(os.path.join(journal.dir, 'otherhost.log'), 'w') as f:
+            f.write('[1,"add","a",1]\n[3,"add","c",2]\n[5,"add"')
+        self.assertEqual(
+            [r[2] for r in journal.records()], ['a', 'b', 'c', 'd'])
+
+    def test_clock_stepping_back(self):
+        journal = Journal(os.path.join(self.temp_dir, 'library.json'))
+        journal.append([(10, 'add', 'a')])
+        journal.compact(lambda records, state: {})
+        # the records are folded by their sequence, the older times are not dropped
+        journal.append([(5, 'add', 'b'), (5, 'remove', 'b')])
+        journal.append([(4, 'add', 'c')])
+        self.assertEqual(
+            [r[1:] for r in journal.records()], [['add', 'c'], ['add', 'b'], ['remove', 'b']])
+        folded = []
+        journal.compact(lambda records, state: folded.extend(records))
+        self.assertEqual([r[2] for r in folded], ['c', 'b', 'b'])
+        self.assertEqual(journal.records(), [])
+
+    def test_library(self):
+        fpath = os.path.join(self.temp_dir, 'library.json')
+        a, b, c, d = [
+            os.path.join(self.temp_dir, n + '.sublime-project') for n in 'abcd']
+        with open(fpath, 'w') as f:
+            json.dump([a], f)
+        library = ProjectsLibrary(fpath)
+        library.add([b, c])
+        library.remove([a])
+        library.replace(c, d)
+        self.assertEqual(ProjectsLibrary(fpath).load(), [b, d])
+
+        library.compact()
+        self.assertEqual(sorted(os.listdir(library._journal.dir)), ['lock', 'state.json'])
+        with open(fpath) as f:
+            self.assertEqual(json.load(f), [b, d])
+
+    def test_recent_projects_of_two_instances(self):
+        fpath = os.path.join(self.temp_dir, 'recent.json')
+        recent1 = RecentProjects(fpath)
+        recent2 = RecentProjects(fpath)
+        recent1.add('a', now=1)
+        recent2.add('b', now=2)
+        recent1.add('a', now=3)
+        recent1.save()
+        recent2.save()
+
+        recent1.reload_if_changed()
+        self.assertEqual(recent1.files(), ['b', 'a'])
+        self.assertEqual(recent1.frecency('a', now=3), 200)
+
+        recent1.compact()
+        self.assertEqual(RecentProjects(fpath).files(), ['b', 'a'])
+        recent2.reload_if_changed()
+        self.assertEqual(recent2.files(), ['b', 'a'])
+
+    def test_recent_json_is_a_list_of_project_files(self):
+        fpath = os.path.join(self.temp_dir, 'recent.json')
+        with open(fpath, 'w') as f:
+            json.dump(['old'], f)
+        recent = RecentProjects(fpath)
+        recent.add('a', now=1)
+        recent.add('a', now=2)
+        recent.save()
+        recent.compact()
+        with open(fpath) as f:
+            self.assertEqual(json.load(f), ['old', 'a'])
+
+        recent = RecentProjects(fpath)
+        self.assertEqual(recent.files(), ['old', 'a'])
+        self.assertEqual(recent.frecency('a', now=2), 200)
+        self.assertEqual(recent.frecency('old', now=2), 100)
+
+    def test_folded_records_are_not_applied_again(self):
+        fpath = os.path.join(self.temp_dir, 'recent.json')
+        recent = RecentProjects(fpath)
+        recent.add('a', now=1)
+        recent.add('a', now=2)
+        recent.save()
+        with open(recent._journal.log) as f:
+            log = f.read()
+        other = os.path.join(recent._journal.dir, 'otherhost.log')
+        with open(other, 'w') as f:
+            f.write('[1.5,"open","b",1]\n')
+
+        recent.compact()
+        # the log of the other host is left to it
+        self.assertEqual(recent._journal.files(), [other])
+        self.assertEqual(RecentProjects(fpath).frecency('a', now=2), 200)
+
+        # the log is synced back, or the store was saved before a crash
+        with open(recent._journal.log, 'w') as f:
+            f.write(log)
+        recent = RecentProjects(fpath)
+        self.assertEqual(recent.files(), ['b', 'a'])
+        self.assertEqual(recent.frecency('a', now=2), 200)
+        self.assertEqual(recent.frecency('b', now=2), 100)
+        recent.compact()
+        self.assertEqual(RecentProjects(fpath).frecency('a', now=2), 200)
+
+        recent.add('c', now=3)
+        recent.save()
+        self.assertEqual(RecentProjects(fpath).files(), ['b', 'a', 'c'])
+
+    def test_clear_recent_projects(self):
+        fpath = os.path.join(self.temp_dir, 'recent.json')
+        recent = RecentProjects(fpath)
+        recent.add('a', now=1)
+        recent.save()
+        with open(os.path.join(recent._journal.dir, 'otherhost.log'), 'w') as f:
+            f.write('[2,"open","b",1]\n')
+        recent.clear()
+        self.assertEqual(RecentProjects(fpath).files(), [])
@@ -0,0 +1,76 @@
+from ProjectManager.json_file import JsonFile, write_atomic
+
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+
+class TestJsonFile(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.temp_dir, 'library.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_returns_a_copy(self):
+        j = JsonFile(self.fpath, cache=True)
+        j.save(["a"])
+        data = j.load([])
+        data.append("b")
+        self.assertEqual(JsonFile(self.fpath, cache=True).load([]), ["a"])
+
+    def test_only_opted_in_files_are_cached(self):
+        pfile = os.path.join(self.temp_dir, 'foo.sublime-project')
+        JsonFile(pfile).save({"folders": []})
+        JsonFile(pfile).load()
+        self.assertNotIn(pfile, JsonFile._cache)
+        JsonFile(self.fpath, cache=True).load([])
+        self.assertIn(self.fpath, JsonFile._cache)
+
+    def test_identical_save_is_skipped(self):
+        j = JsonFile(self.fpath)
+        j.save(["a", "b"])
+        mtime = os.stat(self.fpath).st_mtime_ns
+        j.save(["a", "b"])
+        self.assertEqual(os.stat(self.fpath).st_mtime_ns, mtime)
+
+    def test_external_change_is_reloaded(self):
+        j = JsonFile(self.fpath, cache=True)
+        j.save(["a"])
+        j.load([])
+        with open(self.fpath, 'w') as f:
+            f.write('["a", "b", "c"]')
+        self.assertEqual(j.load([]), ["a", "b", "c"])
+
+    def test_save_leaves_no_temporary_file(self):
+        JsonFile(self.fpath).save({"a": 1})
+        self.assertEqual(os.listdir(self.temp_dir), ['library.json'])
+
+    def test_write_atomic(self):
+        self.assertTrue(write_atomic(self.fpath, lambda f: f.write(b'[1]')))
+        # the file is kept when the writer gives up
+        self.assertFalse(write_atomic(self.fpath, lambda f: f.write(b'[2]') and False))
+        with open(self.fpath) as f:
+            self.assertEqual(f.read(), '[1]')
+
+        def fail(f):
+            f.write(b'[3')
+            raise ValueError()
+
+        with self.assertRaises(ValueError):
+            write_atomic(self.fpath, fail)
+        self.assertEqual(os.listdir(self.temp_dir), ['library.json'])
+
+    @skipUnless(hasattr(os, 'symlink') and os.name != 'nt', 'symlinks')
+    def test_save_keeps_symlink(self):
+        target = os.path.join(self.temp_dir, 'target.json')
+        JsonFile(target).save(["a"])
+        os.symlink(target, self.fpath)
+        JsonFile(self.fpath, cache=True).save(["a", "b"])
+        self.assertTrue(os.path.islink(self.fpath))
+        self.assertEqual(JsonFile(target).load([]), ["a", "b"])
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['library.json', 'target.json'])
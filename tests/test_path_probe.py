@@ -0,0 +1,69 @@
+from ProjectManager import path_probe
+from ProjectManager.path_probe import probe_paths, EXISTS, MISSING, UNREACHABLE
+
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import TestCase
+
+
+class TestProbePaths(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.probe_path = path_probe.probe_path
+        self.mount_points = path_probe._mount_points
+        self.release = threading.Event()
+        self.probed = []
+
+        def probe_path(path):
+            self.probed.append(path)
+            if path.startswith(os.path.join(os.sep, 'hung', '')):
+                self.release.wait()
+            return self.probe_path(path)
+
+        path_probe.probe_path = probe_path
+        path_probe._mount_points = lambda: [os.path.join(os.sep, 'hung')]
+
+    def tearDown(self):
+        self.release.set()
+        path_probe.probe_path = self.probe_path
+        path_probe._mount_points = self.mount_points
+        shutil.rmtree(self.temp_dir)
+        # the abandoned threads return
+        deadline = time.time() + 5
+        while path_probe._stuck[0] and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_probe_paths(self):
+        missing = os.path.join(self.temp_dir, 'missing')
+        self.assertEqual(
+            probe_paths([self.temp_dir, missing, '', self.temp_dir]),
+            {self.temp_dir: EXISTS, missing: MISSING, '': MISSING})
+
+    def test_other_paths_of_a_hung_mount_are_not_probed(self):
+        hung = [os.path.join(os.sep, 'hung', name) for name in 'abc']
+        status = probe_paths(hung + [self.temp_dir], timeout=0.2, workers=1)
+        self.assertEqual(status, dict(
+            [(p, UNREACHABLE) for p in hung] + [(self.temp_dir, EXISTS)]))
+        self.assertEqual(self.probed, [hung[0], self.temp_dir])
+        self.assertEqual(path_probe._stuck[0], 1)
+
+        self.release.set()
+        deadline = time.time() + 5
+        while path_probe._stuck[0] and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(path_probe._stuck[0], 0)
+
+    def test_no_thread_is_started_when_too_many_are_stuck(self):
+        stuck = path_probe._stuck[0]
+        path_probe._stuck[0] = path_probe.MAX_STUCK_THREADS
+        try:
+            status = probe_paths([self.temp_dir])
+        finally:
+            path_probe._stuck[0] = stuck
+        self.assertEqual(status, {self.temp_dir: UNREACHABLE})
+        self.assertEqual(self.probed, [])
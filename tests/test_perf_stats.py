@@ -0,0 +1,51 @@
+from ProjectManager.perf_stats import PerfStats
+
+
+from unittest import TestCase
+
+
+class TestPerfStats(TestCase):
+
+    def setUp(self):
+        self.stats = PerfStats(size=10)
+        self.stats.enabled = True
+
+    def test_disabled(self):
+        stats = PerfStats()
+        with stats.timer('refresh'):
+            pass
+        stats.count('reads')
+        self.assertEqual(stats.summary(), {"phases": {}, "counters": {}})
+
+    def test_summary(self):
+        with self.stats.timer('refresh'):
+            pass
+        self.stats.count('reads')
+        self.stats.count('reads', 41)
+        summary = self.stats.summary()
+        self.assertEqual(summary["counters"], {'reads': 42})
+        refresh = summary["phases"]['refresh']
+        self.assertEqual((refresh["calls"], refresh["samples"]), (1, 1))
+        self.assertGreaterEqual(refresh["max"], 0)
+        self.assertIn('refresh', self.stats.format_summary())
+        self.assertIn('reads', self.stats.format_summary())
+
+        self.stats.reset()
+        self.assertEqual(self.stats.summary(), {"phases": {}, "counters": {}})
+
+    def test_percentiles(self):
+        for ms in [5, 1, 4, 2, 3, 100, 9, 6, 8, 7]:
+            self.stats.record('render', ms)
+        render = self.stats.summary()["phases"]['render']
+        self.assertEqual(render["p50"], 5)
+        self.assertEqual(render["p95"], 100)
+        self.assertEqual(render["max"], 100)
+
+    def test_rolling_window(self):
+        for i in range(25):
+            self.stats.record('render', i)
+        render = self.stats.summary()["phases"]['render']
+        # every call is counted, only the last 10 samples are kept
+        self.assertEqual((render["calls"], render["samples"]), (25, 10))
+        self.assertEqual(render["p50"], 19)
+        self.assertEqual(render["max"], 24)
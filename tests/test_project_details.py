@@ -0,0 +1,57 @@
+from ProjectManager.project_details import (
+    ProjectDetailsService, ProjectDetails, git_branch, NO_FOLDER)
+from ProjectManager.path_probe import EXISTS, MISSING
+
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+
+class TestProjectDetails(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.folder = os.path.join(self.temp_dir, 'foo')
+        os.makedirs(os.path.join(self.folder, '.git'))
+        self.write(os.path.join(self.folder, '.git', 'HEAD'), 'ref: refs/heads/main\n')
+        self.pfile = os.path.join(self.temp_dir, 'foo.sublime-project')
+        self.write(self.pfile, '{"folders": [{"path": "foo"}, {"path": "bar"}]}')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, fpath, content):
+        with open(fpath, 'w') as f:
+            f.write(content)
+
+    def test_git_branch(self):
+        self.assertEqual(git_branch(self.folder), 'main')
+        self.assertEqual(git_branch(self.temp_dir), None)
+
+        worktree = os.path.join(self.temp_dir, 'worktree')
+        os.makedirs(os.path.join(worktree, 'git'))
+        self.write(os.path.join(worktree, '.git'), 'gitdir: git\n')
+        self.write(os.path.join(worktree, 'git', 'HEAD'), '0123456789abcdef\n')
+        self.assertEqual(git_branch(worktree), '0123456')
+
+    def test_details_are_updated_when_head_changes(self):
+        service = ProjectDetailsService()
+        missing = os.path.join(self.temp_dir, 'missing')
+        service._update([
+            (self.pfile, self.folder), (self.pfile + '2', missing), (self.pfile + '3', '')])
+        self.assertEqual(service.get(self.pfile), ProjectDetails(2, 'main', EXISTS))
+        self.assertEqual(service.get(self.pfile + '2'), ProjectDetails(0, None, MISSING))
+        self.assertEqual(service.get(self.pfile + '3'), ProjectDetails(0, None, NO_FOLDER))
+        version = service.version
+
+        service._update([(self.pfile, self.folder)])
+        self.assertEqual(service.version, version)
+
+        head = os.path.join(self.folder, '.git', 'HEAD')
+        self.write(head, 'ref: refs/heads/feature/x\n')
+        os.utime(head, ns=(0, 0))
+        service._update([(self.pfile, self.folder)])
+        self.assertEqual(service.get(self.pfile).branch, 'feature/x')
+        self.assertGreater(service.version, version)
@@ -0,0 +1,71 @@
+from ProjectManager.project_scanner import ProjectsScanner
+
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+
+class TestProjectsScanner(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def touch(self, name):
+        fpath = os.path.join(self.temp_dir, name)
+        if not os.path.isdir(os.path.dirname(fpath)):
+            os.makedirs(os.path.dirname(fpath))
+        with open(fpath, 'w') as f:
+            f.write('{}')
+        return fpath
+
+    def scan(self, scanner=None):
+        scanner = scanner or ProjectsScanner()
+        return [os.path.relpath(f, self.temp_dir) for f in scanner.scan(self.temp_dir)]
+
+    def test_scan(self):
+        self.touch('b.sublime-project')
+        self.touch('a/a.sublime-project')
+        self.touch('a/a.sublime-workspace')
+        self.assertEqual(
+            self.scan(), ['b.sublime-project', os.path.join('a', 'a.sublime-project')])
+
+    def test_max_depth(self):
+        self.touch('a.sublime-project')
+        self.touch('x/b.sublime-project')
+        self.touch('x/y/c.sublime-project')
+        self.assertEqual(self.scan(ProjectsScanner(max_depth=0)), ['a.sublime-project'])
+        self.assertEqual(
+            self.scan(ProjectsScanner(max_depth=1)),
+            ['a.sublime-project', os.path.join('x', 'b.sublime-project')])
+        self.assertEqual(len(self.scan(ProjectsScanner(max_depth=-1))), 3)
+
+    def test_ignore_patterns(self):
+        self.touch('a.sublime-project')
+        self.touch('ignored.sublime-project')
+        self.touch('.git/b.sublime-project')
+        self.touch('node_modules/c.sublime-project')
+        scanner = ProjectsScanner(ignore_patterns=['.*', 'node_modules', 'ignored*'])
+        self.assertEqual(self.scan(scanner), ['a.sublime-project'])
+
+        scanner.configure(ignore_patterns=[])
+        self.assertEqual(len(self.scan(scanner)), 4)
+
+    @skipUnless(hasattr(os, 'symlink') and os.name != 'nt', 'symlinks')
+    def test_symlink_loop(self):
+        self.touch('a/a.sublime-project')
+        os.symlink(os.path.join(self.temp_dir, 'a'), os.path.join(self.temp_dir, 'a', 'loop'))
+        os.symlink(self.temp_dir, os.path.join(self.temp_dir, 'root'))
+        self.assertEqual(self.scan(), [os.path.join('a', 'a.sublime-project')])
+
+    @skipUnless(hasattr(os, 'symlink') and os.name != 'nt', 'symlinks')
+    def test_alias_does_not_hide_its_target(self):
+        self.touch('real/r.sublime-project')
+        os.symlink(os.path.join(self.temp_dir, 'real'), os.path.join(self.temp_dir, 'alias'))
+        self.assertEqual(self.scan(), [
+            os.path.join('alias', 'r.sublime-project'),
+            os.path.join('real', 'r.sublime-project')])
@@ -0,0 +1,100 @@
+from ProjectManager import search_index
+from ProjectManager.search_index import ProjectSearchIndex, fuzzy_score, _char_mask
+
+
+from unittest import TestCase
+
+
+ITEMS = [
+    ('ProjectManager', 'sublime', '~/src/ProjectManager', '~/Projects/pm.sublime-project'),
+    ('dotfiles', '', '~/dotfiles', '~/Projects/dotfiles.sublime-project'),
+    ('foo', 'work', '~/work/foo', '~/Projects/work/foo.sublime-project'),
+    ('foobar', 'work', '~/work/foobar', '~/Projects/work/foobar.sublime-project'),
+    ('bar-foo', 'work', '~/work/bar-foo', '~/Projects/work/bar-foo.sublime-project'),
+    ('zoo', 'misc', '~/misc/zoo', '~/Projects/misc/zoo.sublime-project'),
+]
+
+
+class TestFuzzyScore(TestCase):
+
+    def test_no_match(self):
+        self.assertIsNone(fuzzy_score('xyz', 'foobar'))
+        self.assertIsNone(fuzzy_score('ba', 'ab'))
+
+    def test_substring_beats_subsequence(self):
+        self.assertGreater(fuzzy_score('foo', 'foo'), fuzzy_score('foo', 'f_o_o'))
+
+    def test_word_start_is_preferred(self):
+        self.assertGreater(fuzzy_score('foo', 'bar-foo'), fuzzy_score('foo', 'barfoo'))
+        self.assertGreater(fuzzy_score('pm', 'project-manager'), fuzzy_score('pm', 'xpxm'))
+
+    def test_consecutive_characters_are_preferred(self):
+        self.assertGreater(fuzzy_score('pr', 'xprx'), fuzzy_score('pr', 'xpxr'))
+
+    def test_shorter_text_is_preferred(self):
+        self.assertGreater(fuzzy_score('foo', 'foo'), fuzzy_score('foo', 'foobar'))
+
+
+class TestProjectSearchIndex(TestCase):
+
+    def setUp(self):
+        self.index = ProjectSearchIndex(ITEMS)
+
+    def test_char_mask(self):
+        self.assertEqual(_char_mask('ab'), _char_mask('ba'))
+        self.assertEqual(_char_mask('a') | _char_mask('9'), _char_mask('a9'))
+        self.assertEqual(_char_mask('-'), _char_mask('_'))
+        self.assertNotEqual(_char_mask('a') & _char_mask('b'), _char_mask('a'))
+
+    def test_empty_query(self):
+        results, matches = self.index.search('', limit=2)
+        self.assertEqual(results, ['ProjectManager', 'dotfiles'])
+        self.assertEqual(matches, list(range(len(ITEMS))))
+
+    def test_ranking(self):
+        results, matches = self.index.search('foo')
+        # "dotfiles" only matches the paths
+        self.assertEqual(results, ['foo', 'foobar', 'bar-foo', 'dotfiles'])
+        self.assertEqual(sorted(matches), [1, 2, 3, 4])
+
+    def test_case_insensitive_and_limit(self):
+        self.assertEqual(self.index.search('FOO', limit=1)[0], ['foo'])
+
+    def test_paths_are_searched(self):
+        self.assertEqual(self.index.search('misc')[0][0], 'zoo')
+        self.assertEqual(self.index.search('src')[0][0], 'ProjectManager')
+
+    def test_prefilter(self):
+        scored = []
+
+        def score(query, text):
+            scored.append(text)
+            return fuzzy_score(query, text)
+
+        search_index.fuzzy_score = score
+        try:
+            # "q" is in none of the items
+            self.assertEqual(self.index.search('foq'), ([], []))
+            self.assertEqual(scored, [])
+            self.assertEqual(self.index.search('zo')[0], ['zoo'])
+            self.assertEqual(scored, ['zoo'])
+        finally:
+            search_index.fuzzy_score = fuzzy_score
+
+    def test_multiple_terms(self):
+        self.assertEqual(self.index.search('work bar')[0], ['bar-foo', 'foobar'])
+        self.assertEqual(self.index.search('foo misc'), ([], []))
+
+    def test_ties_keep_the_order_of_the_items(self):
+        index = ProjectSearchIndex([(n, '', '', '') for n in ['b', 'a', 'c', 'a']])
+        self.assertEqual(index.search('a'), (['a', 'a'], [1, 3]))
+
+    def test_candidates_narrow_down_a_longer_query(self):
+        _, matches = self.index.search('fo')
+        for query in ['foo', 'foob', 'foobar', 'foo work']:
+            self.assertEqual(
+                self.index.search(query, candidates=matches), self.index.search(query))
+        results, narrowed = self.index.search('foobar', candidates=matches)
+        self.assertEqual(results, ['foobar', 'bar-foo'])
+        self.assertEqual(narrowed, [3, 4])
+        self.assertEqual(self.index.search('foobarx', candidates=narrowed), ([], []))
@@ -0,0 +1,88 @@
+from ProjectManager.workspace_file import (
+    find_top_level_value, patch_workspace_project, compact_workspace)
+
+
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, skipUnless
+
+
+WORKSPACE = '''{
+    "buffers": [{"contents": "{\\"project\\": \\"a\\"} ]", "file": "project"}],
+    // "project": "comment.sublime-project",
+    "find_history": ["project", "\\\\"],
+    "project": "foo.sublime-project",
+    "settings": {"project": "nested"}
+}
+'''
+
+
+class TestWorkspaceFile(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.wsfile = os.path.join(self.temp_dir, 'foo.sublime-workspace')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, content):
+        with open(self.wsfile, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+
+    def read(self):
+        with open(self.wsfile, 'r', encoding='utf-8', newline='') as f:
+            return f.read()
+
+    def test_find_top_level_value(self):
+        buf = WORKSPACE.encode('utf-8')
+        start, end = find_top_level_value(buf, 'project')
+        self.assertEqual(buf[start:end], b'"foo.sublime-project"')
+        self.assertEqual(find_top_level_value(buf, 'file'), None)
+
+    def test_patch_workspace_project(self):
+        self.write(WORKSPACE)
+        self.assertTrue(patch_workspace_project(self.wsfile, 'bär.sublime-project'))
+        self.assertEqual(
+            self.read(),
+            WORKSPACE.replace('"foo.sublime-project"', '"bär.sublime-project"'))
+        self.assertEqual(os.listdir(self.temp_dir), ['foo.sublime-workspace'])
+
+    @skipUnless(hasattr(os, 'symlink') and os.name != 'nt', 'symlinks')
+    def test_patch_keeps_symlink(self):
+        target = os.path.join(self.temp_dir, 'target')
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(WORKSPACE)
+        os.symlink(target, self.wsfile)
+        self.assertTrue(patch_workspace_project(self.wsfile, 'bar.sublime-project'))
+        self.assertTrue(os.path.islink(self.wsfile))
+        self.assertIn('"bar.sublime-project"', self.read())
+
+    def test_workspace_without_project(self):
+        self.write('{"buffers": []}')
+        self.assertFalse(patch_workspace_project(self.wsfile, 'bar.sublime-project'))
+        self.write('')
+        self.assertFalse(patch_workspace_project(self.wsfile, 'bar.sublime-project'))
+
+    def test_compact_workspace(self):
+        data = {
+            "find_state": {"find_history": ["a", "b", "c"], "case_sensitive": False},
+            "console": {"history": ["x"]},
+            "file_history": [os.path.join(self.temp_dir, "missing"), self.temp_dir],
+            "buffers": [{"file": "missing"}]
+        }
+        self.write(json.dumps(data, indent=4))
+        size = os.path.getsize(self.wsfile)
+        saved = compact_workspace(
+            self.wsfile, {"find_history": 2, "console_history": 5, "file_history": 10})
+        self.assertEqual(saved, size - os.path.getsize(self.wsfile))
+        self.assertGreater(saved, 0)
+        with open(self.wsfile) as f:
+            data = json.load(f)
+        self.assertEqual(data["find_state"]["find_history"], ["a", "b"])
+        self.assertEqual(data["console"]["history"], ["x"])
+        self.assertEqual(data["file_history"], [self.temp_dir])
+        self.assertEqual(data["buffers"], [{"file": "missing"}])
+        self.assertEqual(compact_workspace(self.wsfile, {"find_history": 2}), 0)
@@ -0,0 +1,132 @@
+import json
+import mmap
+import os
+import re
+
+from .adapter import get_adapter
+from .json_file import write_atomic
+
+
+# only the strings, the brackets and the comments are tokenized, the rest of
+# the document is skipped by the regex engine
+_token_re = re.compile(br'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|//[^\n]*|/\*.*?\*/', re.DOTALL)
+_value_re = re.compile(br'\s*:\s*("[^"\\]*(?:\\.[^"\\]*)*"|null)')
+
+_chunk_size = 1 << 20
+
+
+def find_top_level_value(buf, key):
+    # returns the span of the string value of a top level key, or None
+    key = json.dumps(key).encode('utf-8')
+    depth = 0
+    for m in _token_re.finditer(buf):
+        start = m.start()
+        c = buf[start:start + 1]
+        if c in b'{[':
+            depth += 1
+        elif c in b'}]':
+            depth -= 1
+            if depth <= 0:
+                return None
+        elif depth == 1 and c == b'"' and m.end() - start == len(key) and \
+                buf[start:m.end()] == key:
+            value = _value_re.match(buf, m.end())
+            if value:
+                return value.span(1)
+    return None
+
+
+def _copy(buf, start, end, f):
+    for i in range(start, end, _chunk_size):
+        f.write(buf[i:min(i + _chunk_size, end)])
+
+
+def patch_workspace_project(fpath, project):
+    # rewrite the "project" entry of a .sublime-workspace file without decoding it,
+    # the rest of the file is copied byte for byte
+    value = json.dumps(project, ensure_ascii=False).encode('utf-8')
+    found = []
+
+    def write(out):
+        with open(os.path.realpath(fpath), mode='rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                span = find_top_level_value(buf, 'project')
+                if span is None:
+                    return False
+                found.append(span)
+                if buf[span[0]:span[1]] == value:
+                    return False
+                _copy(buf, 0, span[0], out)
+                out.write(value)
+                _copy(buf, span[1], len(buf), out)
+        # the file is replaced after it is unmapped, it is required on Windows
+
+    return write_atomic(fpath, write) or bool(found)
+
+
+# the histories of a workspace and where they are stored, the most recent entries
+# come first
+_histories = {
+    'find_history': ('find_state', 'find_history'),
+    'replace_history': ('find_state', 'replace_history'),
+    'where_history': ('find_in_files', 'where_history'),
+    'console_history': ('console', 'history'),
+    'file_history': ('file_history',),
+    'expanded_folders': ('expanded_folders',)
+}
+# entries of these lists are dropped when the files no longer exist
+_file_lists = ('file_history', 'expanded_folders')
+
+
+def _native_path(path):
+    # the paths of a workspace are like "/C/Users/..." on Windows
+    if os.name == 'nt' and re.match(r'/[A-Za-z]/', path):
+        return path[1] + ':' + path[2:]
+    return path
+
+
+def compact_workspace_data(data, limits, exists=os.path.exists):
+    # trim the histories of the decoded workspace in place, returns True if it is changed
+    changed = False
+    for name, keys in _histories.items():
+        parent = data
+        for k in keys[:-1]:
+            parent = parent.get(k) if isinstance(parent, dict) else None
+        if not isinstance(parent, dict) or not isinstance(parent.get(keys[-1]), list):
+            continue
+        history = parent[keys[-1]]
+        kept = history
+        if name in _file_lists:
+            kept = [f for f in kept if not isinstance(f, str) or exists(_native_path(f))]
+        limit = limits.get(name)
+        if isinstance(limit, int) and limit >= 0:
+            kept = kept[:limit]
+        if len(kept) != len(history):
+            parent[keys[-1]] = kept
+            changed = True
+    return changed
+
+
+def compact_workspace(fpath, limits, exists=os.path.exists):
+    # returns the number of bytes saved
+    fpath = os.path.realpath(fpath)
+    st = os.stat(fpath)
+    with open(fpath, mode='r', encoding='utf-8') as f:
+        data = get_adapter().decode_value(f.read())
+    if not isinstance(data, dict) or not compact_workspace_data(data, limits, exists):
+        return 0
+    content = get_adapter().encode_value(data, True).encode('utf-8')
+    if len(content) >= st.st_size:
+        return 0
+
+    def write(f):
+        f.write(content)
+        new_st = os.stat(fpath)
+        # the workspace may have been written by Sublime Text in the meantime
+        return (new_st.st_mtime_ns, new_st.st_size) == (st.st_mtime_ns, st.st_size)
+
+    if not write_atomic(fpath, write):
+        return 0
+    return st.st_size - len(content)